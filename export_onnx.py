@@ -0,0 +1,142 @@
+"""Export the embedding model to ONNX, quantize it to int8 and check its drift against the torch backend.
+
+    python export_onnx.py export --output onnx/all-mpnet-base-v2
+    python export_onnx.py validate --model-dir onnx/all-mpnet-base-v2 --corpus sample.txt
+
+Requires onnx and onnxruntime in addition to the regular requirements. Serve the result with
+EMBEDDING_BACKEND=onnx and EMBEDDING_ONNX_DIR pointing at the output directory.
+"""
+import os
+import sys
+import time
+import argparse
+from typing import List
+import numpy as np
+from dotenv import load_dotenv
+
+load_dotenv()
+
+DEFAULT_MODEL = os.getenv("EMBEDDING_MODEL_NAME", "all-mpnet-base-v2")
+
+SAMPLE_CORPUS = [
+    "A grace period of thirty days is provided for premium payment after the due date.",
+    "Pre-existing diseases are covered after thirty-six months of continuous coverage.",
+    "Maternity expenses are covered for female insured persons who have been continuously covered for at least 24 months.",
+    "Cataract surgery has a specific waiting period of two years.",
+    "The policy indemnifies medical expenses incurred for organ donor hospitalization.",
+    "A No Claim Discount of 5% on the base premium is offered on renewal.",
+    "Room rent is capped at 1% of the sum insured per day for Plan A.",
+    "Hospital means an institution with at least 10 inpatient beds and qualified nursing staff round the clock.",
+    "AYUSH treatments are covered up to the sum insured when taken in an AYUSH hospital.",
+    "Preventive health check-up expenses are reimbursed at the end of every block of two continuous policy years.",
+]
+
+def load_corpus(path: str) -> List[str]:
+    """Read a corpus file: paragraphs separated by blank lines, or one text per line"""
+    with open(path, "r", encoding="utf-8") as f:
+        content = f.read()
+    paragraphs = [" ".join(part.split()) for part in content.split("\n\n")]
+    texts = [paragraph for paragraph in paragraphs if paragraph]
+    if len(texts) <= 1:
+        texts = [line.strip() for line in content.splitlines() if line.strip()]
+    return texts
+
+def export(args):
+    """Export the transformer to ONNX (fp32) and write a dynamically int8-quantized copy next to it"""
+    import torch
+    from sentence_transformers import SentenceTransformer
+    from onnxruntime.quantization import quantize_dynamic, QuantType
+
+    os.makedirs(args.output, exist_ok=True)
+    # Load through sentence-transformers so the weights match the torch backend exactly
+    sentence_model = SentenceTransformer(args.model, device="cpu")
+    transformer = sentence_model[0].auto_model.eval()
+    tokenizer = sentence_model.tokenizer
+
+    class LastHiddenState(torch.nn.Module):
+        def __init__(self, model):
+            super().__init__()
+            self.model = model
+
+        def forward(self, input_ids, attention_mask):
+            return self.model(input_ids=input_ids, attention_mask=attention_mask)[0]
+
+    sample = tokenizer(["export sample", "a slightly longer export sample sentence"], padding=True, return_tensors="pt")
+    fp32_path = os.path.join(args.output, "model.onnx")
+    with torch.no_grad():
+        torch.onnx.export(
+            LastHiddenState(transformer),
+            (sample["input_ids"], sample["attention_mask"]),
+            fp32_path,
+            input_names=["input_ids", "attention_mask"],
+            output_names=["last_hidden_state"],
+            dynamic_axes={
+                "input_ids": {0: "batch", 1: "sequence"},
+                "attention_mask": {0: "batch", 1: "sequence"},
+                "last_hidden_state": {0: "batch", 1: "sequence"}
+            },
+            opset_version=args.opset
+        )
+    tokenizer.save_pretrained(args.output)
+    print(f"Exported {args.model} to {fp32_path}")
+
+    if not args.no_quantize:
+        int8_path = os.path.join(args.output, "model_int8.onnx")
+        quantize_dynamic(fp32_path, int8_path, weight_type=QuantType.QInt8)
+        print(f"Quantized to {int8_path} ({os.path.getsize(fp32_path) >> 20} MB -> {os.path.getsize(int8_path) >> 20} MB)")
+
+def validate(args) -> int:
+    """Report cosine drift and throughput of the ONNX encoder against the torch backend"""
+    from sentence_transformers import SentenceTransformer
+    from services.onnx_encoder import OnnxEncoder
+
+    texts = load_corpus(args.corpus) if args.corpus else SAMPLE_CORPUS
+    sentence_model = SentenceTransformer(args.model, device="cpu")
+    encoder = OnnxEncoder(args.model_dir, model_file=args.model_file, max_seq_length=sentence_model.max_seq_length)
+
+    start = time.perf_counter()
+    reference = sentence_model.encode(texts, batch_size=args.batch_size, convert_to_numpy=True, normalize_embeddings=True)
+    torch_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    candidate = encoder.encode(texts, batch_size=args.batch_size)
+    onnx_seconds = time.perf_counter() - start
+
+    # Both sides are unit length, so the row-wise dot product is the cosine similarity
+    cosines = np.sum(reference.astype(np.float32) * candidate, axis=1)
+    print(f"Texts: {len(texts)}")
+    print(f"Cosine vs torch: mean {cosines.mean():.5f}, min {cosines.min():.5f}, p1 {np.percentile(cosines, 1):.5f}")
+    print(f"torch: {len(texts) / torch_seconds:.1f} texts/s, onnx ({args.model_file}): {len(texts) / onnx_seconds:.1f} texts/s")
+
+    if cosines.min() < args.min_cosine:
+        print(f"FAIL: minimum cosine {cosines.min():.5f} is below {args.min_cosine}")
+        return 1
+    print("OK")
+    return 0
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    export_parser = subparsers.add_parser("export", help="Export and quantize the embedding model")
+    export_parser.add_argument("--model", default=DEFAULT_MODEL)
+    export_parser.add_argument("--output", default=os.path.join("onnx", DEFAULT_MODEL))
+    export_parser.add_argument("--opset", type=int, default=14)
+    export_parser.add_argument("--no-quantize", action="store_true", help="Only write the fp32 graph")
+
+    validate_parser = subparsers.add_parser("validate", help="Compare ONNX embeddings with the torch backend")
+    validate_parser.add_argument("--model", default=DEFAULT_MODEL)
+    validate_parser.add_argument("--model-dir", default=os.path.join("onnx", DEFAULT_MODEL))
+    validate_parser.add_argument("--model-file", default="model_int8.onnx")
+    validate_parser.add_argument("--corpus", help="Text file; paragraphs separated by blank lines or one text per line")
+    validate_parser.add_argument("--batch-size", type=int, default=32)
+    validate_parser.add_argument("--min-cosine", type=float, default=0.98)
+
+    args = parser.parse_args()
+    if args.command == "export":
+        export(args)
+        return 0
+    return validate(args)
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,14 +1,23 @@
-from fastapi import FastAPI, HTTPException, Depends, Security
+from fastapi import FastAPI, HTTPException, Depends, Security, Request, Response
+from fastapi.responses import StreamingResponse
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel, HttpUrl
-from typing import List
+from pydantic import BaseModel, Field, HttpUrl, model_validator
+from typing import List, Dict, Optional, Tuple
+from contextlib import asynccontextmanager
 import os
+import json
+import asyncio
 from dotenv import load_dotenv
 import logging
 
-from services.document_processor import DocumentProcessor
+from services.embedding_engine import EmbeddingEngine, get_embedding_engine
+from services.executors import shutdown_executors, warm_process_executor
+from services.pdf_extraction import warm_up
+from services.vector_store import VectorStore, get_vector_store
+from services.document_processor import DocumentProcessor, DocumentTooLargeError
 from services.qa_service import QAService
+from services.ingestion_jobs import IngestionJobManager
 
 # Load environment variables
 load_dotenv()
@@ -17,11 +26,42 @@ load_dotenv()
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Services are built in lifespan, not at import: spawned PDF workers re-import this module
+# (as __mp_main__ under `python main.py`) and must not load the embedding model
+embedding_engine: Optional[EmbeddingEngine] = None
+vector_store: Optional[VectorStore] = None
+document_processor: Optional[DocumentProcessor] = None
+qa_service: Optional[QAService] = None
+ingestion_jobs: Optional[IngestionJobManager] = None
+
+def init_services():
+    """Build the services (both share one embedding model instance and vector store)"""
+    global embedding_engine, vector_store, document_processor, qa_service, ingestion_jobs
+    embedding_engine = get_embedding_engine()
+    vector_store = get_vector_store(embedding_engine.dimension)
+    document_processor = DocumentProcessor(embedding_engine, vector_store)
+    qa_service = QAService(embedding_engine, vector_store)
+    ingestion_jobs = IngestionJobManager(document_processor)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Build the services and warm the PDF worker processes on startup; release them on shutdown"""
+    init_services()
+    if os.getenv("PDF_EXTRACT_WARMUP", "true").lower() == "true":
+        await warm_process_executor(warm_up)
+    yield
+    await ingestion_jobs.shutdown()
+    await document_processor.aclose()
+    await qa_service.aclose()
+    await embedding_engine.aclose()
+    shutdown_executors()
+
 # Initialize FastAPI app
 app = FastAPI(
     title="HackRx Document QA API",
     description="API for processing documents and answering questions using RAG",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # Add CORS middleware
@@ -41,15 +81,30 @@ API_KEY = os.getenv("API_KEY", "default_api_key")
 
 # Pydantic models
 class QuestionRequest(BaseModel):
-    documents: HttpUrl
+    documents: Optional[HttpUrl] = None
+    # An already-ingested document, e.g. from POST /documents; ids are 32 hex characters and name files in the local store
+    document_id: Optional[str] = Field(None, pattern=r"^[0-9a-f]{32}$")
     questions: List[str]
+    
+    @model_validator(mode="after")
+    def check_document_source(self):
+        """Require exactly one of documents or document_id"""
+        if (self.documents is None) == (self.document_id is None):
+            raise ValueError("Provide exactly one of 'documents' or 'document_id'")
+        return self
 
 class AnswerResponse(BaseModel):
     answers: List[str]
 
-# Initialize services
-document_processor = DocumentProcessor()
-qa_service = QAService()
+class DocumentRequest(BaseModel):
+    documents: HttpUrl
+
+class IngestionJobResponse(BaseModel):
+    job_id: str
+    status: str
+    document_id: Optional[str] = None
+    error: Optional[str] = None
+    progress: Dict
 
 def verify_token(credentials: HTTPAuthorizationCredentials = Security(security)):
     """Verify the bearer token"""
@@ -69,11 +124,45 @@ async def root():
 @app.get("/health")
 async def health_check():
     """Health check endpoint"""
-    return {"status": "healthy", "service": "hackrx-api"}
+    return {
+        "status": "healthy",
+        "service": "hackrx-api",
+        "caches": qa_service.cache_stats(),
+        "embedding_batcher": embedding_engine.stats()
+    }
+
+async def resolve_document_id(request: QuestionRequest) -> str:
+    """Return the document id for a request, ingesting the document URL if needed"""
+    if request.document_id is not None:
+        # Pre-ingested document: skip download and ingestion entirely
+        if not await document_processor.document_exists(request.document_id):
+            raise HTTPException(status_code=404, detail=f"Document {request.document_id} has not been ingested")
+        return request.document_id
+    
+    logger.info(f"Document URL: {request.documents}")
+    
+    # Process the document
+    logger.info("Processing document...")
+    return await document_processor.process_document(str(request.documents))
+
+async def answer_during_ingestion(request: QuestionRequest) -> Tuple[str, List[Dict]]:
+    """Ingest the document URL while answering questions from the chunks indexed so far"""
+    index_ready = asyncio.get_running_loop().create_future()
+    
+    def on_partial_index(index):
+        if not index_ready.done():
+            index_ready.set_result(index)
+    
+    logger.info(f"Document URL: {request.documents} (answering during ingestion)")
+    ingestion = asyncio.create_task(
+        document_processor.process_document(str(request.documents), on_partial_index=on_partial_index)
+    )
+    return await qa_service.answer_multiple_questions_during_ingestion(request.questions, ingestion, index_ready)
 
 @app.post("/hackrx/run", response_model=AnswerResponse)
 async def process_documents_and_questions(
     request: QuestionRequest,
+    response: Response,
     token: str = Depends(verify_token)
 ):
     """
@@ -81,6 +170,7 @@ async def process_documents_and_questions(
     
     Args:
         request: Request containing document URL and questions
+        response: Outgoing response, used to report answer cache hits in X-Answer-Cache-Hits
         token: Bearer token for authentication
     
     Returns:
@@ -88,29 +178,128 @@ async def process_documents_and_questions(
     """
     try:
         logger.info(f"Processing request with {len(request.questions)} questions")
-        logger.info(f"Document URL: {request.documents}")
-        
-        # Process the document
-        logger.info("Processing document...")
-        document_id = await document_processor.process_document(str(request.documents))
         
-        # Generate answers for all questions
-        logger.info("Generating answers...")
-        answers = []
-        for i, question in enumerate(request.questions):
-            logger.info(f"Processing question {i+1}/{len(request.questions)}: {question[:100]}...")
-            answer = await qa_service.answer_question(question, document_id)
-            answers.append(answer)
+        if request.documents is not None and qa_service.early_answering:
+            document_id, results = await answer_during_ingestion(request)
+        else:
+            document_id = await resolve_document_id(request)
+            
+            # Generate answers for all questions
+            logger.info("Generating answers...")
+            results = await qa_service.answer_multiple_questions_with_cache_info(request.questions, document_id)
+        answers = [result["answer"] for result in results]
+        cache_hits = sum(1 for result in results if result["cached"])
+        response.headers["X-Answer-Cache-Hits"] = f"{cache_hits}/{len(results)}"
         
         logger.info(f"Successfully generated {len(answers)} answers")
         return AnswerResponse(answers=answers)
         
+    except HTTPException:
+        raise
+    except DocumentTooLargeError as e:
+        logger.error(f"Document rejected: {str(e)}")
+        raise HTTPException(status_code=413, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error processing request: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error processing request: {str(e)}"
+        )
+
+@app.post("/hackrx/run/stream")
+async def stream_documents_and_questions(
+    request: QuestionRequest,
+    http_request: Request,
+    stream_tokens: bool = False,
+    token: str = Depends(verify_token)
+):
+    """
+    Process documents and stream each answer as soon as it is ready
+    
+    Args:
+        request: Request containing document URL (or document_id) and questions
+        http_request: Incoming request; an Accept of text/event-stream selects SSE, otherwise NDJSON
+        stream_tokens: Also stream Gemini output as {"index", "delta"} events
+        token: Bearer token for authentication
+    
+    Returns:
+        StreamingResponse: One {"index", "question", "answer", "cached"} event per question, then a done event
+    """
+    try:
+        logger.info(f"Streaming request with {len(request.questions)} questions")
+        document_id = await resolve_document_id(request)
+    except HTTPException:
+        raise
+    except DocumentTooLargeError as e:
+        logger.error(f"Document rejected: {str(e)}")
+        raise HTTPException(status_code=413, detail=str(e))
     except Exception as e:
         logger.error(f"Error processing request: {str(e)}")
         raise HTTPException(
             status_code=500,
             detail=f"Error processing request: {str(e)}"
         )
+    
+    use_sse = "text/event-stream" in http_request.headers.get("accept", "")
+    
+    def format_event(name: str, data: Dict) -> str:
+        if use_sse:
+            return f"event: {name}\ndata: {json.dumps(data)}\n\n"
+        return json.dumps({"event": name, **data}) + "\n"
+    
+    async def events():
+        answered = 0
+        async for event in qa_service.stream_answers(request.questions, document_id, stream_tokens):
+            if "delta" in event:
+                yield format_event("delta", event)
+            else:
+                answered += 1
+                yield format_event("answer", {"question": request.questions[event["index"]], **event})
+        yield format_event("done", {"answers": answered})
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream" if use_sse else "application/x-ndjson",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.post("/documents", response_model=IngestionJobResponse, status_code=202)
+async def submit_document(
+    request: DocumentRequest,
+    token: str = Depends(verify_token)
+):
+    """
+    Enqueue ingestion of a document so questions can be asked about it later
+    
+    Args:
+        request: Request containing the document URL
+        token: Bearer token for authentication
+    
+    Returns:
+        IngestionJobResponse: The queued job; poll GET /documents/{job_id} for progress
+    """
+    job = await ingestion_jobs.submit(str(request.documents))
+    return IngestionJobResponse(**job)
+
+@app.get("/documents/{job_id}", response_model=IngestionJobResponse)
+async def get_document_job(
+    job_id: str,
+    token: str = Depends(verify_token)
+):
+    """
+    Report the status and progress of an ingestion job
+    
+    Args:
+        job_id: Id returned by POST /documents
+        token: Bearer token for authentication
+    
+    Returns:
+        IngestionJobResponse: Job status, progress counters and, once completed, the document_id
+    """
+    job = await ingestion_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Unknown ingestion job {job_id}")
+    return IngestionJobResponse(**job)
 
 if __name__ == "__main__":
     import uvicorn
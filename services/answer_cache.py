@@ -0,0 +1,100 @@
+import json
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from typing import Dict, Optional
+
+from services.sqlite_store import SQLiteStore
+
+logger = logging.getLogger(__name__)
+
+class AnswerCache(SQLiteStore):
+    def __init__(self, db_path: str, ttl_seconds: float, max_entries: int):
+        """Persistent SQLite cache of generated answers with TTL and LRU eviction"""
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        super().__init__(db_path)
+
+    def _create_schema(self, connection: sqlite3.Connection):
+        """Create the answers table if it does not exist"""
+        connection.execute(
+            """
+            CREATE TABLE IF NOT EXISTS answers (
+                cache_key TEXT PRIMARY KEY,
+                answer TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )
+            """
+        )
+        connection.execute("CREATE INDEX IF NOT EXISTS answers_last_access ON answers (last_access)")
+
+    @staticmethod
+    def make_key(document_id: str, question: str, retrieval_params: Dict, prompt_version: str) -> str:
+        """Build a cache key from the document, normalized question, retrieval parameters and prompt version"""
+        normalized_question = " ".join(question.split()).lower()
+        payload = json.dumps([document_id, normalized_question, retrieval_params, prompt_version], sort_keys=True)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, cache_key: str) -> Optional[str]:
+        """Return a cached answer that has not expired, or None"""
+        now = time.time()
+        with self._connect() as connection:
+            row = connection.execute(
+                "SELECT answer FROM answers WHERE cache_key = ? AND created_at >= ?",
+                (cache_key, now - self.ttl_seconds)
+            ).fetchone()
+            if row:
+                connection.execute("UPDATE answers SET last_access = ? WHERE cache_key = ?", (now, cache_key))
+
+        with self._lock:
+            if row:
+                self.hits += 1
+            else:
+                self.misses += 1
+        return row[0] if row else None
+
+    def put(self, cache_key: str, answer: str):
+        """Store an answer, dropping expired entries and the least recently used beyond max_entries"""
+        if not answer.strip():
+            # An empty answer is a failed generation; caching it would repeat the failure until the TTL
+            logger.warning("Not caching an empty answer")
+            return
+        now = time.time()
+        with self._connect() as connection:
+            connection.execute(
+                """
+                INSERT INTO answers (cache_key, answer, created_at, last_access) VALUES (?, ?, ?, ?)
+                ON CONFLICT(cache_key) DO UPDATE SET
+                    answer = excluded.answer,
+                    created_at = excluded.created_at,
+                    last_access = excluded.last_access
+                """,
+                (cache_key, answer, now, now)
+            )
+            connection.execute("DELETE FROM answers WHERE created_at < ?", (now - self.ttl_seconds,))
+            connection.execute(
+                """
+                DELETE FROM answers WHERE cache_key IN (
+                    SELECT cache_key FROM answers ORDER BY last_access ASC
+                    LIMIT MAX(0, (SELECT COUNT(*) FROM answers) - ?)
+                )
+                """,
+                (self.max_entries,)
+            )
+
+    def stats(self) -> Dict:
+        """Return hit/miss counters for this process"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0
+            }
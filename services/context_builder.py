@@ -0,0 +1,101 @@
+import logging
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+class ContextBuilder:
+    def __init__(self, token_budget: int, encoding_name: str = "cl100k_base", max_overlap_chars: int = 400):
+        """Merge overlapping retrieved chunks and pack them into a prompt under a token budget"""
+        self.token_budget = token_budget
+        self.max_overlap_chars = max_overlap_chars
+        self.encoding = None
+        try:
+            import tiktoken
+
+            self.encoding = tiktoken.get_encoding(encoding_name)
+        except Exception as e:
+            # Offline hosts may not be able to fetch the BPE file; fall back to a character estimate
+            logger.warning(f"tiktoken unavailable ({str(e)}), estimating tokens as characters / 4")
+
+    def count_tokens(self, text: str) -> int:
+        """Count tokens in text"""
+        if self.encoding is not None:
+            return len(self.encoding.encode(text, disallowed_special=()))
+        return (len(text) + 3) // 4
+
+    def truncate_to_tokens(self, text: str, max_tokens: int) -> str:
+        """Cut text down to at most max_tokens tokens"""
+        if self.encoding is not None:
+            return self.encoding.decode(self.encoding.encode(text, disallowed_special=())[:max_tokens])
+        return text[:max_tokens * 4]
+
+    def _overlap_length(self, left: str, right: str) -> int:
+        """Length of the longest suffix of left that is also a prefix of right"""
+        for length in range(min(len(left), len(right), self.max_overlap_chars), 0, -1):
+            if left.endswith(right[:length]):
+                return length
+        return 0
+
+    def _join(self, left: Dict, right: Dict) -> Optional[str]:
+        """Join two chunks that are consecutive in the document, removing the duplicated span"""
+        left_start, right_start = left.get("start_offset"), right.get("start_offset")
+        if left_start is not None and right_start is not None:
+            left_end = left_start + len(left["text"])
+            if right_start > left_end:
+                return None
+            return left["text"] + right["text"][left_end - right_start:]
+
+        # Without offsets, only neighbouring chunk indices are merged, trimming their textual overlap
+        if right["chunk_index"] != left["last_chunk_index"] + 1:
+            return None
+        overlap = self._overlap_length(left["text"], right["text"])
+        return left["text"] + (right["text"][overlap:] if overlap else "\n" + right["text"])
+
+    def merge_chunks(self, chunks: List[Dict]) -> List[Dict]:
+        """Collapse duplicate and adjacent/overlapping chunks into contiguous spans, keeping the best score"""
+        unique: Dict[int, Dict] = {}
+        for chunk in chunks:
+            existing = unique.get(chunk["chunk_index"])
+            if existing is None or chunk["score"] > existing["score"]:
+                unique[chunk["chunk_index"]] = chunk
+
+        spans: List[Dict] = []
+        for chunk in sorted(unique.values(), key=lambda c: c["chunk_index"]):
+            if spans:
+                joined = self._join(spans[-1], chunk)
+                if joined is not None:
+                    spans[-1]["text"] = joined
+                    spans[-1]["score"] = max(spans[-1]["score"], chunk["score"])
+                    spans[-1]["last_chunk_index"] = chunk["chunk_index"]
+                    continue
+            spans.append({
+                "text": chunk["text"],
+                "score": chunk["score"],
+                "chunk_index": chunk["chunk_index"],
+                "last_chunk_index": chunk["chunk_index"],
+                "start_offset": chunk.get("start_offset")
+            })
+        return spans
+
+    def build(self, chunks: List[Dict], token_budget: Optional[int] = None) -> str:
+        """Build the prompt context: merged spans, highest score first, within the token budget"""
+        token_budget = token_budget or self.token_budget
+        spans = sorted(self.merge_chunks(chunks), key=lambda span: span["score"], reverse=True)
+
+        parts = []
+        used_tokens = 0
+        for span in spans:
+            tokens = self.count_tokens(span["text"])
+            remaining = token_budget - used_tokens
+            if tokens <= remaining:
+                parts.append(span["text"])
+                used_tokens += tokens
+            elif not parts and remaining > 0:
+                # Never return an empty context because the single best span is too long
+                parts.append(self.truncate_to_tokens(span["text"], remaining))
+                used_tokens = token_budget
+
+        if len(parts) < len(spans):
+            logger.warning(f"Context budget of {token_budget} tokens dropped {len(spans) - len(parts)} of {len(spans)} spans")
+        logger.info(f"Packed {len(parts)} of {len(spans)} context spans ({used_tokens} tokens)")
+        return "\n\n".join(parts)
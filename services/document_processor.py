@@ -1,34 +1,62 @@
 import httpx
+import asyncio
 import hashlib
+import random
 import tempfile
 import os
-from typing import List, Dict
+from urllib.parse import parse_qsl, urlencode, urlsplit
+from typing import AsyncIterator, Callable, List, Dict, Optional, Tuple
 import logging
-from PyPDF2 import PdfReader
 from langchain.text_splitter import RecursiveCharacterTextSplitter
-from sentence_transformers import SentenceTransformer
-from pinecone import Pinecone
 import numpy as np
 from dotenv import load_dotenv
 
+from services.embedding_engine import EmbeddingEngine, get_embedding_engine, pad_embeddings
+from services.executors import run_io, run_cpu, run_process, process_worker_count
+from services.pdf_extraction import count_pages, extract_page_range, page_ranges
+from services.incremental_chunker import IncrementalChunker
+from services.partial_index import PartialIndex
+from services.single_flight import SingleFlight
+from services.ingestion_lock import create_ingestion_lock
+from services.document_registry import DocumentRegistry
+from services.vector_store import VectorStore, get_vector_store
+
 load_dotenv()
 
 logger = logging.getLogger(__name__)
 
+# Query parameters that only sign or time-limit access to a blob (Azure SAS, S3 presigned URLs); they
+# change on every re-signing without changing the document
+SIGNATURE_QUERY_PARAMS = {
+    "sig", "st", "se", "sp", "sv", "sr", "spr", "si", "ss", "srt",
+    "skoid", "sktid", "skt", "ske", "sks", "skv", "sdd"
+}
+
+class DocumentTooLargeError(Exception):
+    """Raised when a document exceeds the configured maximum download size"""
+    pass
+
+def report_progress(progress: Optional[Dict], **updates):
+    """Update an ingestion progress dict in place, if the caller is tracking one"""
+    if progress is not None:
+        progress.update(updates)
+
 class DocumentProcessor:
-    def __init__(self):
-        """Initialize the document processor with Pinecone and SentenceTransformers"""
-        self.pinecone_api_key = os.getenv("PINECONE_API_KEY")
-        self.pinecone_host = os.getenv("PINECONE_HOST")
-        self.pinecone_index_name = os.getenv("PINECONE_INDEX_NAME", "hackrx-documents")
+    def __init__(self, embedding_engine: Optional[EmbeddingEngine] = None, vector_store: Optional[VectorStore] = None):
+        """Initialize the document processor with the shared embedding engine and vector store"""
+        # Shared sentence transformer for embeddings (one model copy per process)
+        self.embedding_engine = embedding_engine or get_embedding_engine()
+        self.embedding_dimension = self.embedding_engine.dimension  # 768 for all-mpnet-base-v2
         
-        # Initialize sentence transformer for embeddings
-        # Use a model that produces embeddings closer to your index dimension (1024)
-        self.embedding_model = SentenceTransformer('all-mpnet-base-v2')
-        self.embedding_dimension = 768  # all-mpnet-base-v2 dimension
+        # Vector store (Pinecone or local); embeddings are padded to its dimension
+        self.vector_store = vector_store or get_vector_store(self.embedding_dimension)
         
-        # Pad embeddings to match Pinecone index dimension (1024)
-        self.pinecone_dimension = 1024
+        # Upsert batching: batches are sized by estimated payload bytes and sent concurrently
+        self.upsert_concurrency = max(1, int(os.getenv("PINECONE_UPSERT_CONCURRENCY", 4)))
+        self.upsert_max_bytes = int(os.getenv("PINECONE_UPSERT_MAX_BYTES", 1_500_000))  # Pinecone caps requests at 2 MB
+        self.upsert_max_vectors = int(os.getenv("PINECONE_UPSERT_MAX_VECTORS", 200))
+        self.upsert_retries = int(os.getenv("PINECONE_UPSERT_RETRIES", 3))
+        self.upsert_backoff = float(os.getenv("PINECONE_UPSERT_BACKOFF", 0.5))
         
         # Initialize text splitter
         self.text_splitter = RecursiveCharacterTextSplitter(
@@ -38,181 +66,500 @@ class DocumentProcessor:
             separators=["\n\n", "\n", " ", ""]
         )
         
-        # Initialize Pinecone
-        self._init_pinecone()
+        # Pooled HTTP client for document downloads (created lazily, closed on shutdown)
+        self.http_client: Optional[httpx.AsyncClient] = None
+        self.download_max_connections = int(os.getenv("DOWNLOAD_MAX_CONNECTIONS", 10))
+        self.download_chunk_size = int(os.getenv("DOWNLOAD_CHUNK_SIZE", 64 * 1024))
+        self.max_document_size = int(float(os.getenv("MAX_DOCUMENT_SIZE_MB", 200)) * 1024 * 1024)
+        
+        # Revalidate known URLs with If-None-Match / If-Modified-Since instead of downloading again
+        self.conditional_get = os.getenv("CONDITIONAL_GET", "true").lower() == "true"
+        
+        # Documents with at least this many pages are extracted across the process pool
+        self.parallel_extraction_min_pages = int(os.getenv("PDF_PARALLEL_MIN_PAGES", 40))
+        
+        # Streaming ingestion: pages, chunks and embedded batches pass between stages through bounded queues
+        self.pipeline_queue_depth = max(1, int(os.getenv("PIPELINE_QUEUE_DEPTH", 4)))
+        self.pipeline_page_batch = max(1, int(os.getenv("PIPELINE_PAGE_BATCH", 8)))
+        self.pipeline_embed_batch = max(1, int(os.getenv("PIPELINE_EMBED_BATCH", 64)))
+        self.pipeline_flush_chars = 8000  # Text buffered before the incremental chunker re-splits (8 chunk sizes)
+        
+        # Concurrent requests for the same document share one ingestion; the lock extends that across workers
+        self.single_flight = SingleFlight()
+        self.ingestion_lock = create_ingestion_lock()
+        
+        # In-memory indexes of documents being ingested, for answering questions before ingestion finishes
+        self.partial_indexes: Dict[str, PartialIndex] = {}
+        
+        # Local registry of ingested documents, consulted before asking the vector store; entries are
+        # kept per vector store so switching backend or index does not report stale documents
+        self.registry = DocumentRegistry(
+            os.getenv("DOCUMENT_REGISTRY_PATH", os.path.join(tempfile.gettempdir(), "hackrx", "documents.db")),
+            namespace=self.vector_store.namespace
+        )
+
     
-    def _init_pinecone(self):
-        """Initialize Pinecone connection"""
+    def _get_http_client(self) -> httpx.AsyncClient:
+        """Return the pooled download HTTP client, creating it on first use"""
+        if self.http_client is None or self.http_client.is_closed:
+            self.http_client = httpx.AsyncClient(
+                timeout=30.0,
+                follow_redirects=True,
+                limits=httpx.Limits(
+                    max_connections=self.download_max_connections,
+                    max_keepalive_connections=self.download_max_connections
+                )
+            )
+        return self.http_client
+    
+    async def aclose(self):
+        """Close the pooled download HTTP client"""
+        if self.http_client is not None:
+            await self.http_client.aclose()
+            self.http_client = None
+            logger.info("Download HTTP client closed")
+    
+    async def download_pdf(self, url: str, etag: Optional[str] = None, last_modified: Optional[str] = None) -> Optional[Dict]:
+        """Stream PDF from URL to a temporary file, hashing it on the way.
+        
+        Returns the file path, SHA-256 of the content and the response validators,
+        or None when the validators passed in show the content is unchanged (HTTP 304).
+        """
+        temp_file_path = None
         try:
-            # Initialize Pinecone with modern client
-            pc = Pinecone(api_key=self.pinecone_api_key)
+            client = self._get_http_client()
+            logger.info(f"Downloading PDF from: {url}")
             
-            # Connect to existing index using host
-            self.index = pc.Index(host=self.pinecone_host)
-            logger.info("Pinecone initialized successfully")
+            headers = {}
+            if etag:
+                headers["If-None-Match"] = etag
+            if last_modified:
+                headers["If-Modified-Since"] = last_modified
             
-        except Exception as e:
-            logger.error(f"Error initializing Pinecone: {str(e)}")
-            raise
-    
-    async def download_pdf(self, url: str) -> str:
-        """Download PDF from URL and return the file path"""
-        try:
-            async with httpx.AsyncClient(timeout=30.0) as client:
-                logger.info(f"Downloading PDF from: {url}")
-                response = await client.get(url)
+            async with client.stream("GET", url, headers=headers) as response:
+                if response.status_code == 304:
+                    logger.info("PDF not modified since last download")
+                    return None
                 response.raise_for_status()
                 
-                # Create temporary file
+                # Reject oversized documents before reading the body when the server tells us the size
+                content_length = response.headers.get("content-length")
+                if content_length and int(content_length) > self.max_document_size:
+                    raise DocumentTooLargeError(
+                        f"Document size {content_length} bytes exceeds limit of {self.max_document_size} bytes"
+                    )
+                
+                # Write chunks straight to disk so memory stays flat regardless of document size
+                downloaded = 0
+                content_hash = hashlib.sha256()
                 with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as temp_file:
-                    temp_file.write(response.content)
                     temp_file_path = temp_file.name
-                
-                logger.info(f"PDF downloaded successfully to: {temp_file_path}")
-                return temp_file_path
-                
+                    async for chunk in response.aiter_bytes(self.download_chunk_size):
+                        downloaded += len(chunk)
+                        if downloaded > self.max_document_size:
+                            raise DocumentTooLargeError(
+                                f"Document exceeds limit of {self.max_document_size} bytes"
+                            )
+                        content_hash.update(chunk)
+                        temp_file.write(chunk)
+            
+            logger.info(f"PDF downloaded successfully to: {temp_file_path} ({downloaded} bytes)")
+            return {
+                "path": temp_file_path,
+                "content_hash": content_hash.hexdigest(),
+                "etag": response.headers.get("etag"),
+                "last_modified": response.headers.get("last-modified")
+            }
+            
         except Exception as e:
             logger.error(f"Error downloading PDF: {str(e)}")
+            if temp_file_path and os.path.exists(temp_file_path):
+                os.unlink(temp_file_path)
             raise
     
-    def extract_text_from_pdf(self, pdf_path: str) -> str:
-        """Extract text from PDF file"""
+    async def iter_page_texts(self, pdf_path: str) -> AsyncIterator[str]:
+        """Yield per-page text in order as page ranges finish, using the process pool for large documents"""
+        page_count = await run_cpu(count_pages, pdf_path)
+        ranges = page_ranges(page_count, self.pipeline_page_batch)
+        
+        if page_count < self.parallel_extraction_min_pages:
+            # Small documents: process start-up and pickling would cost more than they save
+            in_flight_limit = 1
+            extract = lambda start, end: run_cpu(extract_page_range, pdf_path, start, end)
+        else:
+            in_flight_limit = process_worker_count()
+            extract = lambda start, end: run_process(extract_page_range, pdf_path, start, end)
+            logger.info(f"Extracting {page_count} pages across {in_flight_limit} worker processes")
+        
+        # Keep up to in_flight_limit ranges running ahead; results are yielded in page order
+        pending: List[asyncio.Future] = []
+        next_range = 0
         try:
-            logger.info(f"Extracting text from PDF: {pdf_path}")
-            text = ""
-            
-            with open(pdf_path, 'rb') as file:
-                pdf_reader = PdfReader(file)
-                
-                for page_num, page in enumerate(pdf_reader.pages):
-                    page_text = page.extract_text()
-                    text += f"\n--- Page {page_num + 1} ---\n{page_text}"
-            
-            logger.info(f"Extracted {len(text)} characters from PDF")
-            return text
-            
-        except Exception as e:
-            logger.error(f"Error extracting text from PDF: {str(e)}")
+            while next_range < len(ranges) or pending:
+                while next_range < len(ranges) and len(pending) < in_flight_limit:
+                    pending.append(asyncio.ensure_future(extract(*ranges[next_range])))
+                    next_range += 1
+                for page_text in await pending.pop(0):
+                    yield page_text
+        finally:
+            for future in pending:
+                future.cancel()
+    
+    async def iter_pages(self, pdf_path: str) -> AsyncIterator[Dict]:
+        """Yield extracted pages with character offsets into the full document"""
+        offset = 0
+        page_number = 0
+        async for page_text in self.iter_page_texts(pdf_path):
+            page_number += 1
+            section = f"\n--- Page {page_number} ---\n{page_text}"
+            yield {
+                "page_number": page_number,
+                "text": section,
+                "start_offset": offset,
+                "end_offset": offset + len(section)
+            }
+            offset += len(section)
+    
+    def create_chunker(self) -> IncrementalChunker:
+        """Create a page-by-page chunker using the document text splitter"""
+        return IncrementalChunker(self.text_splitter, flush_chars=self.pipeline_flush_chars)
+    
+    def _estimate_vector_bytes(self, chunk: Dict) -> int:
+        """Estimate the serialized size of one vector: JSON floats, metadata text and fixed overhead"""
+        return self.vector_store.dimension * 20 + len(chunk["text"][:1000].encode("utf-8")) + 200
+    
+    def plan_upsert_batches(self, chunks: List[Dict]) -> List[Tuple[int, int]]:
+        """Split chunks into contiguous (start, end) batches bounded by payload bytes and vector count"""
+        batches = []
+        start = 0
+        batch_bytes = 0
+        for i, chunk in enumerate(chunks):
+            vector_bytes = self._estimate_vector_bytes(chunk)
+            if i > start and (batch_bytes + vector_bytes > self.upsert_max_bytes or i - start >= self.upsert_max_vectors):
+                batches.append((start, i))
+                start = i
+                batch_bytes = 0
+            batch_bytes += vector_bytes
+        if start < len(chunks):
+            batches.append((start, len(chunks)))
+        return batches
+    
+    def _chunk_metadata(self, chunk: Dict, document_id: str) -> Dict:
+        """Build the metadata stored alongside a chunk vector"""
+        return {
+            "document_id": document_id,
+            "chunk_index": chunk["chunk_index"],
+            "page_number": chunk["page_number"],
+            "start_offset": chunk["start_offset"],
+            "text": chunk["text"][:1000]  # Store first 1000 chars in metadata
+        }
+    
+    async def _upsert_with_retry(self, document_id: str, chunks: List[Dict], embeddings: np.ndarray):
+        """Upsert one batch, retrying transient failures with exponential backoff and jitter"""
+        ids = [f"{document_id}_chunk_{chunk['chunk_index']}" for chunk in chunks]
+        metadatas = [self._chunk_metadata(chunk, document_id) for chunk in chunks]
+        for attempt in range(self.upsert_retries + 1):
+            try:
+                await run_io(self.vector_store.upsert, document_id, ids, embeddings, metadatas)
+                return
+            except Exception as e:
+                # Client errors other than rate limiting will not succeed on retry
+                status = getattr(e, "status", None)
+                retryable = status is None or status == 429 or status >= 500
+                if not retryable or attempt == self.upsert_retries:
+                    raise
+                delay = self.upsert_backoff * (2 ** attempt) * (0.5 + random.random())
+                logger.warning(
+                    f"Upsert of {len(ids)} vectors failed ({str(e)}), "
+                    f"retrying in {delay:.2f}s ({attempt + 1}/{self.upsert_retries})"
+                )
+                await asyncio.sleep(delay)
+    
+    async def upsert_stream(
+        self,
+        document_id: str,
+        batches: AsyncIterator[Tuple[List[Dict], np.ndarray]],
+        progress: Optional[Dict] = None
+    ) -> int:
+        """Upsert (chunks, embeddings) groups as they arrive, in byte-sized batches with bounded concurrency"""
+        # The semaphore is taken before a batch is sent, so at most upsert_concurrency payloads exist at once
+        semaphore = asyncio.Semaphore(self.upsert_concurrency)
+        
+        async def upsert_batch(chunks: List[Dict], embeddings: np.ndarray):
+            try:
+                await self._upsert_with_retry(document_id, chunks, embeddings)
+                if progress is not None:
+                    progress["vectors_upserted"] = progress.get("vectors_upserted", 0) + len(chunks)
+            finally:
+                semaphore.release()
+        
+        tasks = []
+        stored = 0
+        try:
+            async for chunks, embeddings in batches:
+                for start, end in self.plan_upsert_batches(chunks):
+                    await semaphore.acquire()
+                    failed = next((task for task in tasks if task.done() and task.exception()), None)
+                    if failed is not None:
+                        semaphore.release()
+                        raise failed.exception()
+                    tasks.append(asyncio.create_task(upsert_batch(chunks[start:end], embeddings[start:end])))
+                    stored += end - start
+                # Drop references to finished batches so their payloads can be freed
+                tasks = [task for task in tasks if not task.done() or task.exception()]
+            await asyncio.gather(*tasks)
+            return stored
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
             raise
+    
+    async def run_ingestion_pipeline(
+        self,
+        pdf_path: str,
+        document_id: str,
+        progress: Optional[Dict] = None,
+        partial_index: Optional[PartialIndex] = None
+    ) -> int:
+        """Stream a PDF through extraction, chunking, embedding and upsert concurrently; returns the chunk count.
+        
+        Stages are connected by bounded queues, so memory is bounded by queue depth rather than document
+        size and the first vectors are stored while later pages are still being parsed. Embedded batches
+        are also added to partial_index, when given, as soon as they are encoded.
+        """
+        page_queue: asyncio.Queue = asyncio.Queue(maxsize=self.pipeline_queue_depth * self.pipeline_page_batch)
+        chunk_queue: asyncio.Queue = asyncio.Queue(maxsize=self.pipeline_queue_depth * self.pipeline_embed_batch)
+        embedded_queue: asyncio.Queue = asyncio.Queue(maxsize=self.pipeline_queue_depth)
+        
+        async def extract_stage():
+            async for page in self.iter_pages(pdf_path):
+                await page_queue.put(page)
+                report_progress(progress, pages_extracted=page["page_number"])
+            await page_queue.put(None)
+        
+        async def chunk_stage():
+            chunker = self.create_chunker()
+            chunk_count = 0
+            while True:
+                page = await page_queue.get()
+                chunks = chunker.add_page(page) if page is not None else chunker.finish()
+                for chunk in chunks:
+                    await chunk_queue.put(chunk)
+                chunk_count += len(chunks)
+                report_progress(progress, chunks_total=chunk_count)
+                if page is None:
+                    break
+            await chunk_queue.put(None)
+        
+        async def embed_stage():
+            batch: List[Dict] = []
+            embedded = 0
+            while True:
+                chunk = await chunk_queue.get()
+                if chunk is not None:
+                    batch.append(chunk)
+                if batch and (chunk is None or len(batch) >= self.pipeline_embed_batch):
+                    embeddings = await self.embedding_engine.encode_async([c["text"] for c in batch])
+                    embeddings = pad_embeddings(embeddings, self.vector_store.dimension)
+                    if partial_index is not None:
+                        partial_index.add(batch, embeddings)
+                    await embedded_queue.put((batch, embeddings))
+                    embedded += len(batch)
+                    report_progress(progress, chunks_embedded=embedded)
+                    batch = []
+                if chunk is None:
+                    break
+            await embedded_queue.put(None)
+        
+        async def embedded_batches():
+            while True:
+                item = await embedded_queue.get()
+                if item is None:
+                    return
+                yield item
+        
+        stages = [
+            asyncio.create_task(extract_stage()),
+            asyncio.create_task(chunk_stage()),
+            asyncio.create_task(embed_stage()),
+            asyncio.create_task(self.upsert_stream(document_id, embedded_batches(), progress))
+        ]
+        try:
+            # A failing stage cancels the rest instead of leaving them blocked on a full or empty queue
+            done, _ = await asyncio.wait(stages, return_when=asyncio.FIRST_EXCEPTION)
+            for task in done:
+                if task.exception() is not None:
+                    raise task.exception()
+            stored = stages[-1].result()
         finally:
-            # Clean up temporary file
+            for task in stages:
+                task.cancel()
+            await asyncio.gather(*stages, return_exceptions=True)
             if os.path.exists(pdf_path):
                 os.unlink(pdf_path)
+        
+        await run_io(self.vector_store.finalize_document, document_id)
+        return stored
+    
+    def generate_document_id(self, content_hash: str) -> str:
+        """Generate a unique document ID from the SHA-256 of the document content"""
+        return content_hash[:32]
     
-    def chunk_text(self, text: str) -> List[str]:
-        """Split text into chunks for embedding"""
+    def generate_url_key(self, url: str) -> str:
+        """Key a URL without its blob-signature parameters, so re-signed URLs for the same file share an alias"""
+        parts = urlsplit(url)
+        query = [
+            (name, value) for name, value in parse_qsl(parts.query, keep_blank_values=True)
+            if name.lower() not in SIGNATURE_QUERY_PARAMS and not name.lower().startswith("x-amz-")
+        ]
+        key = f"{parts.scheme}://{parts.netloc.lower()}{parts.path}"
+        return f"{key}?{urlencode(sorted(query))}" if query else key
+    
+    async def document_exists(self, document_id: str) -> bool:
+        """Check if document was already ingested, asking the vector store only when the local registry misses"""
         try:
-            logger.info("Chunking text for embedding")
-            chunks = self.text_splitter.split_text(text)
-            logger.info(f"Created {len(chunks)} text chunks")
-            return chunks
-            
+            if await run_io(self.registry.get, document_id):
+                return True
         except Exception as e:
-            logger.error(f"Error chunking text: {str(e)}")
-            raise
-    
-    def create_embeddings(self, chunks: List[str]) -> List[List[float]]:
-        """Create embeddings for chunks using SentenceTransformers and pad to match Pinecone dimension"""
+            logger.error(f"Error reading document registry: {str(e)}")
+        
         try:
-            logger.info(f"Creating embeddings for {len(chunks)} chunks")
-            embeddings = self.embedding_model.encode(chunks)
-            
-            # Pad embeddings to match Pinecone index dimension (1024)
-            padded_embeddings = []
-            for embedding in embeddings:
-                # Convert to regular float and pad with zeros to reach 1024 dimensions
-                embedding_list = [float(x) for x in embedding]
-                padded = embedding_list + [0.0] * (self.pinecone_dimension - len(embedding_list))
-                padded_embeddings.append(padded)
-            
-            logger.info(f"Created and padded {len(padded_embeddings)} embeddings to dimension {self.pinecone_dimension}")
-            return padded_embeddings
+            exists = await run_io(self.vector_store.has_document, document_id)
+            if exists:
+                # Ingested before the registry existed or by another host; remember it locally
+                await run_io(self.registry.record, document_id)
+            return exists
             
         except Exception as e:
-            logger.error(f"Error creating embeddings: {str(e)}")
-            raise
+            logger.error(f"Error checking document existence: {str(e)}")
+            return False
     
-    async def store_embeddings(self, chunks: List[str], embeddings: List[List[float]], document_id: str):
-        """Store embeddings in Pinecone"""
+    async def process_document(
+        self,
+        url: str,
+        progress: Optional[Dict] = None,
+        on_partial_index: Optional[Callable[[PartialIndex], None]] = None
+    ) -> str:
+        """Main method to process a document from URL, optionally reporting stage and counts into progress.
+        
+        When on_partial_index is given and the document has to be ingested, it is called with a
+        PartialIndex that fills up as chunks are embedded, so questions can be answered early.
+        """
         try:
-            logger.info(f"Storing {len(embeddings)} embeddings in Pinecone")
+            url_key = self.generate_url_key(url)
             
-            # Prepare vectors for Pinecone
-            vectors = []
-            for i, (chunk, embedding) in enumerate(zip(chunks, embeddings)):
-                vector_id = f"{document_id}_chunk_{i}"
-                vectors.append({
-                    "id": vector_id,
-                    "values": embedding,
-                    "metadata": {
-                        "document_id": document_id,
-                        "chunk_index": i,
-                        "text": chunk[:1000]  # Store first 1000 chars in metadata
-                    }
-                })
-            
-            # Store in Pinecone (batch upsert)
-            batch_size = 100
-            for i in range(0, len(vectors), batch_size):
-                batch = vectors[i:i + batch_size]
-                self.index.upsert(vectors=batch)
-            
-            logger.info(f"Successfully stored {len(vectors)} vectors in Pinecone")
+            # Concurrent callers for the same URL share one resolution (and ingestion); progress and the
+            # partial index are reported to the caller that started it. Keyed on the full URL: the alias
+            # key may map different URLs together, but only content hashing proves they are one document
+            document_id = await self.single_flight.do(
+                f"url:{url}", lambda: self._resolve_document(url, url_key, progress, on_partial_index)
+            )
+            logger.info(f"Processed document with ID: {document_id}")
+            return document_id
             
         except Exception as e:
-            logger.error(f"Error storing embeddings: {str(e)}")
+            logger.error(f"Error processing document: {str(e)}")
             raise
     
-    def generate_document_id(self, url: str) -> str:
-        """Generate a unique document ID based on URL"""
-        return hashlib.md5(url.encode()).hexdigest()
-    
-    async def document_exists(self, document_id: str) -> bool:
-        """Check if document already exists in Pinecone"""
+    async def _resolve_document(
+        self,
+        url: str,
+        url_key: str,
+        progress: Optional[Dict] = None,
+        on_partial_index: Optional[Callable[[PartialIndex], None]] = None
+    ) -> str:
+        """Identify the document behind a URL by its content, ingesting it if it is new"""
+        alias = await run_io(self.registry.get_alias, url_key)
+        report_progress(progress, stage="downloading")
+        
+        download = None
+        # An ETag identifies content, so it is valid for any URL of the alias; If-Modified-Since only
+        # compares dates, so it is sent only to the exact URL the validator came from
+        etag = alias["etag"] if alias else None
+        last_modified = alias["last_modified"] if alias and alias["source_url"] == url else None
+        if self.conditional_get and (etag or last_modified):
+            download = await self.download_pdf(url, etag, last_modified)
+            if download is None:
+                if await self.document_exists(alias["document_id"]):
+                    logger.info(f"Document {alias['document_id']} unchanged at {url_key}, skipping download")
+                    report_progress(progress, stage="completed", document_id=alias["document_id"])
+                    return alias["document_id"]
+                # Content unchanged but never fully ingested; fetch it in full
+        
+        if download is None:
+            download = await self.download_pdf(url)
+        
+        pdf_path = download["path"]
         try:
-            # Query for any vector with this document_id
-            results = self.index.query(
-                vector=[0.0] * self.pinecone_dimension,  # Dummy vector with correct dimension
-                filter={"document_id": document_id},
-                top_k=1,
-                include_metadata=True
+            document_id = self.generate_document_id(download["content_hash"])
+            report_progress(progress, document_id=document_id)
+            await run_io(
+                self.registry.record_alias, url_key, document_id, download["etag"], download["last_modified"], url
             )
-            return len(results['matches']) > 0
-            
-        except Exception as e:
-            logger.error(f"Error checking document existence: {str(e)}")
-            return False
-    
-    async def process_document(self, url: str) -> str:
-        """Main method to process a document from URL"""
-        try:
-            # Generate document ID
-            document_id = self.generate_document_id(url)
-            logger.info(f"Processing document with ID: {document_id}")
             
             # Check if document already exists
             if await self.document_exists(document_id):
                 logger.info(f"Document {document_id} already exists, skipping processing")
+                report_progress(progress, stage="completed")
                 return document_id
             
-            # Download PDF
-            pdf_path = await self.download_pdf(url)
+            # Different URLs serving the same content still share one ingestion (and its partial index)
+            if on_partial_index is not None and document_id in self.partial_indexes:
+                on_partial_index(self.partial_indexes[document_id])
+            await self.single_flight.do(
+                document_id,
+                lambda: self._ingest_document(pdf_path, document_id, download["content_hash"], progress, on_partial_index)
+            )
+            report_progress(progress, stage="completed")
+            return document_id
             
-            # Extract text
-            text = self.extract_text_from_pdf(pdf_path)
+        finally:
+            # Extraction removes the file; this covers the paths that skip ingestion
+            if os.path.exists(pdf_path):
+                os.unlink(pdf_path)
+    
+    async def _ingest_document(
+        self,
+        pdf_path: str,
+        document_id: str,
+        content_hash: str,
+        progress: Optional[Dict] = None,
+        on_partial_index: Optional[Callable[[PartialIndex], None]] = None
+    ):
+        """Extract, chunk, embed and store a downloaded document under the cross-worker ingestion lock"""
+        async with self.ingestion_lock.hold(document_id):
+            # Another worker may have finished ingesting while we waited for the lock
+            if await self.document_exists(document_id):
+                logger.info(f"Document {document_id} was ingested by another worker")
+                return
             
-            # Chunk text
-            chunks = self.chunk_text(text)
+            # Extraction, chunking, embedding and upserts overlap; counters in progress advance together
+            report_progress(progress, stage="ingesting")
+            logger.info(f"Ingesting document {document_id} from {pdf_path}")
             
-            # Create embeddings
-            embeddings = self.create_embeddings(chunks)
+            partial_index = None
+            if on_partial_index is not None:
+                partial_index = PartialIndex(document_id, self.vector_store.dimension)
+                self.partial_indexes[document_id] = partial_index
+                on_partial_index(partial_index)
+            try:
+                chunk_count = await self.run_ingestion_pipeline(pdf_path, document_id, progress, partial_index)
+                
+                # Record only after every vector is stored so a partial ingestion is never treated as done
+                await run_io(self.registry.record, document_id, chunk_count, content_hash)
+            except BaseException as e:
+                if partial_index is not None:
+                    partial_index.close(e)
+                try:
+                    await run_io(self.vector_store.abort_document, document_id)
+                except Exception as abort_error:
+                    logger.error(f"Error discarding vectors of failed document {document_id}: {str(abort_error)}")
+                raise
+            finally:
+                self.partial_indexes.pop(document_id, None)
             
-            # Store embeddings
-            await self.store_embeddings(chunks, embeddings, document_id)
+            if partial_index is not None:
+                partial_index.close()
             
             logger.info(f"Document {document_id} processed successfully")
-            return document_id
-            
-        except Exception as e:
-            logger.error(f"Error processing document: {str(e)}")
-            raise
\ No newline at end of file
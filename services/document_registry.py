@@ -0,0 +1,119 @@
+import time
+import sqlite3
+import logging
+from typing import Dict, Optional
+
+from services.sqlite_store import SQLiteStore
+
+logger = logging.getLogger(__name__)
+
+class DocumentRegistry(SQLiteStore):
+    def __init__(self, db_path: str, namespace: str = ""):
+        """Local SQLite record of ingested documents, shared by all workers on the host.
+
+        Documents are recorded per namespace (the vector store backend and index), so switching stores
+        never reports documents that only exist in the previous one.
+        """
+        self.namespace = namespace
+        super().__init__(db_path)
+
+    def _create_schema(self, connection: sqlite3.Connection):
+        """Create the registry tables if they do not exist"""
+        columns = {row["name"] for row in connection.execute("PRAGMA table_info(documents)")}
+        if columns and "namespace" not in columns:
+            # Entries from before namespacing cannot be attributed to a store; document_exists
+            # re-records them after confirming with the vector store
+            connection.execute("DROP TABLE documents")
+        connection.execute(
+            """
+            CREATE TABLE IF NOT EXISTS documents (
+                namespace TEXT NOT NULL,
+                document_id TEXT NOT NULL,
+                chunk_count INTEGER,
+                content_hash TEXT,
+                ingested_at REAL NOT NULL,
+                PRIMARY KEY (namespace, document_id)
+            )
+            """
+        )
+        # Maps a URL (without signature parameters) to the content it last served, the HTTP validators
+        # and the full URL they were received from
+        connection.execute(
+            """
+            CREATE TABLE IF NOT EXISTS url_aliases (
+                url_key TEXT PRIMARY KEY,
+                document_id TEXT NOT NULL,
+                etag TEXT,
+                last_modified TEXT,
+                source_url TEXT,
+                updated_at REAL NOT NULL
+            )
+            """
+        )
+        columns = {row["name"] for row in connection.execute("PRAGMA table_info(url_aliases)")}
+        if "source_url" not in columns:
+            connection.execute("ALTER TABLE url_aliases ADD COLUMN source_url TEXT")
+
+    def get(self, document_id: str) -> Optional[Dict]:
+        """Return the registry entry for a document, or None if it is unknown"""
+        with self._connect() as connection:
+            row = connection.execute(
+                """
+                SELECT document_id, chunk_count, content_hash, ingested_at
+                FROM documents WHERE namespace = ? AND document_id = ?
+                """,
+                (self.namespace, document_id)
+            ).fetchone()
+        return dict(row) if row else None
+
+    def record(self, document_id: str, chunk_count: Optional[int] = None, content_hash: Optional[str] = None):
+        """Record a fully ingested document"""
+        with self._connect() as connection:
+            connection.execute(
+                """
+                INSERT INTO documents (namespace, document_id, chunk_count, content_hash, ingested_at)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT(namespace, document_id) DO UPDATE SET
+                    chunk_count = COALESCE(excluded.chunk_count, documents.chunk_count),
+                    content_hash = COALESCE(excluded.content_hash, documents.content_hash),
+                    ingested_at = excluded.ingested_at
+                """,
+                (self.namespace, document_id, chunk_count, content_hash, time.time())
+            )
+        logger.info(f"Recorded document {document_id} in local registry ({chunk_count} chunks)")
+
+    def get_alias(self, url_key: str) -> Optional[Dict]:
+        """Return the alias entry (document_id, etag, last_modified, source_url) for a URL key, or None"""
+        with self._connect() as connection:
+            row = connection.execute(
+                """
+                SELECT url_key, document_id, etag, last_modified, source_url, updated_at
+                FROM url_aliases WHERE url_key = ?
+                """,
+                (url_key,)
+            ).fetchone()
+        return dict(row) if row else None
+
+    def record_alias(
+        self,
+        url_key: str,
+        document_id: str,
+        etag: Optional[str] = None,
+        last_modified: Optional[str] = None,
+        source_url: Optional[str] = None
+    ):
+        """Point a URL key at the document its content hashed to, with the validators from source_url"""
+        with self._connect() as connection:
+            connection.execute(
+                """
+                INSERT INTO url_aliases (url_key, document_id, etag, last_modified, source_url, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT(url_key) DO UPDATE SET
+                    document_id = excluded.document_id,
+                    etag = excluded.etag,
+                    last_modified = excluded.last_modified,
+                    source_url = excluded.source_url,
+                    updated_at = excluded.updated_at
+                """,
+                (url_key, document_id, etag, last_modified, source_url, time.time())
+            )
@@ -0,0 +1,143 @@
+import asyncio
+import logging
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+class EmbeddingBatcher:
+    def __init__(
+        self,
+        encode: Callable[[List[str]], np.ndarray],
+        window_ms: float,
+        max_batch_texts: int,
+        priority_max_texts: int = 32
+    ):
+        """Coalesce concurrent encode requests into shared encode calls run on a dedicated thread.
+
+        The first request opens a window of window_ms; small requests (at most priority_max_texts texts,
+        such as a request's questions) submitted before it closes are encoded together and resolved
+        first. Larger requests (ingestion micro-batches) are queued and encoded one per pass, so a
+        question never waits behind more than one of them. `encode` is expected to split its input
+        into length-sorted batches.
+        """
+        self.encode_texts = encode
+        self.window = window_ms / 1000.0
+        self.max_batch_texts = max_batch_texts
+        self.priority_max_texts = priority_max_texts
+
+        # One thread owns the model, so batches never compete with each other for cores
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="embed")
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._backlog: "deque[Tuple[List[str], asyncio.Future]]" = deque()
+
+        self.requests = 0
+        self.batches = 0
+
+    def _ensure_worker(self):
+        loop = asyncio.get_running_loop()
+        if self._worker is None or self._worker.done() or self._loop is not loop:
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._backlog.clear()
+            self._worker = loop.create_task(self._run())
+
+    async def encode(self, texts: List[str]) -> np.ndarray:
+        """Encode texts as part of the next shared batch"""
+        if not texts:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, self.encode_texts, texts)
+        self._ensure_worker()
+        future = self._loop.create_future()
+        await self._queue.put((texts, future))
+        return await future
+
+    async def _collect(self) -> List[Tuple[List[str], asyncio.Future]]:
+        """Wait for a request, then gather more until the window closes or the batch is full"""
+        requests = [await self._queue.get()]
+        count = len(requests[0][0])
+        deadline = self._loop.time() + self.window
+        while count < self.max_batch_texts:
+            timeout = deadline - self._loop.time()
+            if timeout <= 0:
+                break
+            try:
+                request = await asyncio.wait_for(self._queue.get(), timeout)
+            except asyncio.TimeoutError:
+                break
+            requests.append(request)
+            count += len(request[0])
+        # Callers that gave up while waiting are dropped before any work is done for them
+        return [(texts, future) for texts, future in requests if not future.cancelled()]
+
+    def _drain(self) -> List[Tuple[List[str], asyncio.Future]]:
+        """Take every request that arrived while the worker was busy, without waiting"""
+        requests = []
+        while not self._queue.empty():
+            requests.append(self._queue.get_nowait())
+        return [(texts, future) for texts, future in requests if not future.cancelled()]
+
+    async def _run(self):
+        while True:
+            # Wait for a window only when idle; while large requests are queued, keep the worker busy
+            requests = await self._collect() if not self._backlog else self._drain()
+            small = [request for request in requests if len(request[0]) <= self.priority_max_texts]
+            self._backlog.extend(request for request in requests if len(request[0]) > self.priority_max_texts)
+            if small:
+                await self._encode_and_resolve(small)
+            if self._backlog:
+                await self._encode_and_resolve([self._backlog.popleft()])
+
+    async def _encode_and_resolve(self, requests: List[Tuple[List[str], asyncio.Future]]):
+        """Encode a group of requests on the worker thread and resolve their futures"""
+        requests = [(texts, future) for texts, future in requests if not future.cancelled()]
+        if not requests:
+            return
+        try:
+            results = await self._loop.run_in_executor(
+                self._executor, self._encode_requests, [texts for texts, _ in requests]
+            )
+            for (_, future), result in zip(requests, results):
+                if not future.done():
+                    future.set_result(result)
+        except Exception as e:
+            logger.error(f"Error encoding batch of {len(requests)} requests: {str(e)}")
+            for _, future in requests:
+                if not future.done():
+                    future.set_exception(e)
+
+    def _encode_requests(self, requests: List[List[str]]) -> List[np.ndarray]:
+        """Encode every request's texts in one call and split the rows back per request"""
+        embeddings = self.encode_texts([text for request in requests for text in request])
+
+        self.requests += len(requests)
+        self.batches += 1
+        results = []
+        offset = 0
+        for request in requests:
+            results.append(embeddings[offset:offset + len(request)])
+            offset += len(request)
+        return results
+
+    def stats(self) -> Dict:
+        """Return request and batch counters"""
+        return {
+            "requests": self.requests,
+            "batches": self.batches,
+            "requests_per_batch": round(self.requests / self.batches, 2) if self.batches else 0.0
+        }
+
+    async def aclose(self):
+        """Stop the scheduler and its worker thread"""
+        if self._worker is not None:
+            self._worker.cancel()
+            await asyncio.gather(self._worker, return_exceptions=True)
+            self._worker = None
+        for _, future in self._backlog:
+            future.cancel()
+        self._backlog.clear()
+        self._executor.shutdown(wait=True)
@@ -0,0 +1,120 @@
+import os
+import logging
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+class EmbeddingCache:
+    def __init__(self, max_entries: int, max_bytes: int, persist_path: Optional[str] = None, model_signature: str = ""):
+        """Bounded LRU of text -> embedding, capped by entry count and total embedding bytes.
+
+        model_signature identifies the model that produced the embeddings; a persisted cache saved under
+        a different signature (another model, backend or dimension) is discarded on load.
+        """
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.persist_path = persist_path
+        self.model_signature = model_signature
+
+        self._entries: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+        if self.persist_path:
+            self.load()
+
+    @staticmethod
+    def normalize(text: str) -> str:
+        """Collapse whitespace and case so trivially different phrasings share an entry"""
+        return " ".join(text.split()).lower()
+
+    def get(self, text: str) -> Optional[np.ndarray]:
+        """Return the cached embedding for text, or None"""
+        key = self.normalize(text)
+        with self._lock:
+            embedding = self._entries.get(key)
+            if embedding is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return embedding
+
+    def put(self, text: str, embedding: np.ndarray):
+        """Cache an embedding, evicting least recently used entries beyond the caps"""
+        key = self.normalize(text)
+        embedding = np.array(embedding, dtype=np.float32)
+        embedding.setflags(write=False)  # Shared between callers
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= previous.nbytes
+            self._entries[key] = embedding
+            self._bytes += embedding.nbytes
+            while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= evicted.nbytes
+
+    def stats(self) -> Dict:
+        """Return hit/miss counters and current size"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0
+            }
+
+    def save(self):
+        """Write the cache to persist_path (atomically) so warm restarts keep it"""
+        if not self.persist_path:
+            return
+        with self._lock:
+            keys = list(self._entries.keys())
+            embeddings = list(self._entries.values())
+        if not keys:
+            return
+
+        directory = os.path.dirname(self.persist_path) or "."
+        os.makedirs(directory, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=directory, suffix=".npz")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                np.savez(
+                    f, keys=np.array(keys), embeddings=np.stack(embeddings), model=np.array(self.model_signature)
+                )
+            os.replace(temp_path, self.persist_path)
+            logger.info(f"Saved {len(keys)} cached embeddings to {self.persist_path}")
+        except Exception as e:
+            logger.error(f"Error saving embedding cache: {str(e)}")
+            if os.path.exists(temp_path):
+                os.unlink(temp_path)
+
+    def load(self):
+        """Load a previously saved cache, keeping LRU order"""
+        if not self.persist_path or not os.path.exists(self.persist_path):
+            return
+        try:
+            with np.load(self.persist_path) as data:
+                saved_signature = str(data["model"]) if "model" in data.files else None
+                if saved_signature != self.model_signature:
+                    logger.warning(
+                        f"Discarding embedding cache {self.persist_path}: saved for model {saved_signature}, "
+                        f"running {self.model_signature}"
+                    )
+                    return
+                keys = data["keys"].tolist()
+                embeddings = data["embeddings"]
+                for key, embedding in zip(keys, embeddings):
+                    self.put(key, embedding)
+            logger.info(f"Loaded {len(self._entries)} cached embeddings from {self.persist_path}")
+        except Exception as e:
+            logger.error(f"Error loading embedding cache: {str(e)}")
@@ -0,0 +1,157 @@
+import os
+import logging
+import threading
+from typing import Dict, List, Optional
+import numpy as np
+from dotenv import load_dotenv
+
+from services.executors import run_cpu
+from services.embedding_batcher import EmbeddingBatcher
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+class EmbeddingEngine:
+    def __init__(self):
+        """Load the embedding model shared by document ingestion and question answering"""
+        self.model_name = os.getenv("EMBEDDING_MODEL_NAME", "all-mpnet-base-v2")
+        # torch runs SentenceTransformer; onnx runs the graph exported by export_onnx.py with ONNX Runtime
+        self.backend = os.getenv("EMBEDDING_BACKEND", "torch").lower()
+        self.device = os.getenv("EMBEDDING_DEVICE") or None  # None lets sentence-transformers pick
+        self.batch_size = int(os.getenv("EMBEDDING_BATCH_SIZE", 32))
+        # Padded tokens per forward pass (batch size x longest text); texts are sorted by token length first
+        self.token_budget = int(os.getenv("EMBEDDING_TOKEN_BUDGET", 8192))
+
+        # Concurrent encode_async calls are coalesced for this long; 0 encodes each call on its own
+        self.batch_window_ms = float(os.getenv("EMBEDDING_BATCH_WINDOW_MS", 3))
+        self.batcher: Optional[EmbeddingBatcher] = None
+        if self.batch_window_ms > 0:
+            self.batcher = EmbeddingBatcher(
+                self.encode_bucketed,
+                window_ms=self.batch_window_ms,
+                max_batch_texts=int(os.getenv("EMBEDDING_MAX_BATCH_TEXTS", 256)),
+                priority_max_texts=int(os.getenv("EMBEDDING_PRIORITY_MAX_TEXTS", 32))
+            )
+
+        try:
+            logger.info(f"Loading embedding model {self.model_name} ({self.backend} backend)")
+            if self.backend == "torch":
+                from sentence_transformers import SentenceTransformer
+
+                self.model = SentenceTransformer(self.model_name, device=self.device)
+                self.dimension = self.model.get_sentence_embedding_dimension()
+                logger.info(f"Embedding model loaded on {self.model.device} (dimension {self.dimension})")
+            elif self.backend == "onnx":
+                from services.onnx_encoder import OnnxEncoder
+
+                self.model = OnnxEncoder(
+                    os.getenv("EMBEDDING_ONNX_DIR", os.path.join("onnx", self.model_name)),
+                    model_file=os.getenv("EMBEDDING_ONNX_FILE", "model_int8.onnx"),
+                    max_seq_length=int(os.getenv("EMBEDDING_MAX_SEQ_LENGTH", 384)),
+                    threads=int(os.getenv("EMBEDDING_ONNX_THREADS", 0)) or None
+                )
+                self.dimension = self.model.dimension
+            else:
+                raise ValueError(f"Unknown EMBEDDING_BACKEND: {self.backend}")
+
+        except Exception as e:
+            logger.error(f"Error loading embedding model: {str(e)}")
+            raise
+
+    def signature(self) -> str:
+        """Identify the vectors this engine produces: model, backend (and ONNX graph) and dimension"""
+        parts = [self.model_name, self.backend]
+        if self.backend == "onnx":
+            parts.append(os.path.basename(self.model.model_path))
+        parts.append(str(self.dimension))
+        return "|".join(parts)
+
+    def encode(self, texts: List[str], batch_size: Optional[int] = None) -> np.ndarray:
+        """Encode texts into a (len(texts), dimension) array of embeddings"""
+        if self.backend == "onnx":
+            return self.model.encode(texts, batch_size=batch_size or self.batch_size)
+        return self.model.encode(
+            texts,
+            batch_size=batch_size or self.batch_size,
+            show_progress_bar=False,
+            convert_to_numpy=True
+        ).astype(np.float32, copy=False)
+
+    def count_tokens(self, texts: List[str]) -> List[int]:
+        """Count model tokens per text, including special tokens and truncation"""
+        encoded = self.model.tokenizer(
+            texts, add_special_tokens=True, truncation=True, max_length=self.model.max_seq_length
+        )
+        return [len(ids) for ids in encoded["input_ids"]]
+
+    def plan_batches(self, lengths: List[int]) -> List[List[int]]:
+        """Group text indices longest first into batches bounded by batch_size and the padded token budget"""
+        order = sorted(range(len(lengths)), key=lambda i: lengths[i], reverse=True)
+        batches: List[List[int]] = []
+        current: List[int] = []
+        for i in order:
+            # The first text of a batch is its longest, so it sets the padded length of every row
+            padded_tokens = (len(current) + 1) * lengths[current[0]] if current else lengths[i]
+            if current and (len(current) >= self.batch_size or padded_tokens > self.token_budget):
+                batches.append(current)
+                current = []
+            current.append(i)
+        if current:
+            batches.append(current)
+        return batches
+
+    def encode_bucketed(self, texts: List[str]) -> np.ndarray:
+        """Encode texts in token-length-sorted batches sized by the token budget, returning rows in input order"""
+        if len(texts) <= 1:
+            return self.encode(texts)
+
+        embeddings: Optional[np.ndarray] = None
+        for batch in self.plan_batches(self.count_tokens(texts)):
+            encoded = self.encode([texts[i] for i in batch], batch_size=len(batch))
+            if embeddings is None:
+                embeddings = np.empty((len(texts), encoded.shape[1]), dtype=np.float32)
+            embeddings[batch] = encoded
+        return embeddings
+
+    async def encode_async(self, texts: List[str], batch_size: Optional[int] = None) -> np.ndarray:
+        """Encode texts off the event loop, sharing a batch with other concurrent callers when batching is on.
+
+        Without an explicit batch_size, texts are bucketed by token length (see encode_bucketed).
+        """
+        if batch_size is not None:
+            return await run_cpu(self.encode, texts, batch_size)
+        if self.batcher is not None:
+            return await self.batcher.encode(texts)
+        return await run_cpu(self.encode_bucketed, texts)
+
+    def stats(self) -> Dict:
+        """Return micro-batching counters"""
+        return self.batcher.stats() if self.batcher is not None else {}
+
+    async def aclose(self):
+        """Stop the micro-batching scheduler"""
+        if self.batcher is not None:
+            await self.batcher.aclose()
+
+def pad_embeddings(embeddings: np.ndarray, dimension: int) -> np.ndarray:
+    """Zero-pad a (n, d) float32 matrix to (n, dimension) with a single preallocated copy"""
+    if embeddings.shape[1] == dimension:
+        return embeddings
+    if embeddings.shape[1] > dimension:
+        raise ValueError(f"Embedding dimension {embeddings.shape[1]} exceeds index dimension {dimension}")
+    padded = np.zeros((embeddings.shape[0], dimension), dtype=np.float32)
+    padded[:, :embeddings.shape[1]] = embeddings
+    return padded
+
+_engine: Optional[EmbeddingEngine] = None
+_engine_lock = threading.Lock()
+
+def get_embedding_engine() -> EmbeddingEngine:
+    """Return the process-wide embedding engine, loading the model on first use"""
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                _engine = EmbeddingEngine()
+    return _engine
@@ -0,0 +1,97 @@
+import os
+import asyncio
+import logging
+import multiprocessing
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from typing import Callable, Optional, TypeVar
+from dotenv import load_dotenv
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Network I/O (Pinecone queries/upserts) and CPU-bound work (model encoding) get
+# separately sized pools so a burst of slow queries never starves encoding, and vice versa.
+# GIL-bound pure-Python work (PDF parsing) goes to a process pool instead.
+_io_executor: Optional[ThreadPoolExecutor] = None
+_cpu_executor: Optional[ThreadPoolExecutor] = None
+_process_executor: Optional[ProcessPoolExecutor] = None
+_lock = threading.Lock()
+
+def get_io_executor() -> ThreadPoolExecutor:
+    """Return the shared thread pool for blocking network I/O"""
+    global _io_executor
+    if _io_executor is None:
+        with _lock:
+            if _io_executor is None:
+                workers = int(os.getenv("IO_EXECUTOR_WORKERS", 16))
+                _io_executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="io")
+                logger.info(f"Created I/O executor with {workers} workers")
+    return _io_executor
+
+def get_cpu_executor() -> ThreadPoolExecutor:
+    """Return the shared thread pool for CPU-bound work such as embedding encodes"""
+    global _cpu_executor
+    if _cpu_executor is None:
+        with _lock:
+            if _cpu_executor is None:
+                # torch releases the GIL during inference, so threads are enough here
+                workers = int(os.getenv("CPU_EXECUTOR_WORKERS", 2))
+                _cpu_executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="cpu")
+                logger.info(f"Created CPU executor with {workers} workers")
+    return _cpu_executor
+
+def process_worker_count() -> int:
+    """Return the configured number of process pool workers"""
+    return max(1, int(os.getenv("PDF_EXTRACT_WORKERS", os.cpu_count() or 1)))
+
+def get_process_executor() -> ProcessPoolExecutor:
+    """Return the shared process pool for pure-Python CPU work that holds the GIL (PDF parsing)"""
+    global _process_executor
+    if _process_executor is None:
+        with _lock:
+            if _process_executor is None:
+                workers = process_worker_count()
+                # Spawn rather than fork: by the time the pool exists the parent runs several threads
+                # (executors, embedding batcher, torch), and a forked child can inherit a held lock
+                _process_executor = ProcessPoolExecutor(
+                    max_workers=workers, mp_context=multiprocessing.get_context("spawn")
+                )
+                logger.info(f"Created process executor with {workers} workers")
+    return _process_executor
+
+async def run_io(func: Callable[..., T], *args, **kwargs) -> T:
+    """Run a blocking network call on the I/O executor"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_io_executor(), functools.partial(func, *args, **kwargs))
+
+async def run_cpu(func: Callable[..., T], *args, **kwargs) -> T:
+    """Run a CPU-bound call on the CPU executor"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_cpu_executor(), functools.partial(func, *args, **kwargs))
+
+async def run_process(func: Callable[..., T], *args) -> T:
+    """Run a picklable module-level function on the process executor"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_process_executor(), func, *args)
+
+async def warm_process_executor(func: Callable[[], T]):
+    """Start every process pool worker up front by running a picklable no-op once per worker"""
+    await asyncio.gather(*(run_process(func) for _ in range(process_worker_count())))
+    logger.info("Process executor warmed up")
+
+def shutdown_executors():
+    """Shut down the shared executors, waiting for in-flight work to finish"""
+    global _io_executor, _cpu_executor, _process_executor
+    with _lock:
+        for executor in (_io_executor, _cpu_executor, _process_executor):
+            if executor is not None:
+                executor.shutdown(wait=True)
+        _io_executor = None
+        _cpu_executor = None
+        _process_executor = None
+    logger.info("Executors shut down")
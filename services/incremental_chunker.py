@@ -0,0 +1,76 @@
+import bisect
+import logging
+from typing import Dict, List
+
+logger = logging.getLogger(__name__)
+
+class IncrementalChunker:
+    def __init__(self, text_splitter, flush_chars: int):
+        """Chunk a document page by page, emitting chunks as soon as the text after them is known.
+
+        Only the text from the start of the last (possibly incomplete) chunk onwards is buffered, so
+        memory stays bounded by flush_chars. Offsets and page numbers are exact, and every chunk overlaps
+        its predecessor as the splitter would, but because each split only sees the buffered text,
+        chunk boundaries (and so the chunk count) can differ from splitting the whole document at once.
+        """
+        self.text_splitter = text_splitter
+        self.flush_chars = flush_chars
+
+        self._buffer = ""
+        self._buffer_start = 0  # Document offset of the first buffered character
+        self._page_starts: List[int] = []
+        self._page_numbers: List[int] = []
+        self._next_chunk_index = 0
+
+    def add_page(self, page: Dict) -> List[Dict]:
+        """Add one extracted page ({'page_number', 'text', 'start_offset'}) and return any completed chunks"""
+        self._page_starts.append(page["start_offset"])
+        self._page_numbers.append(page["page_number"])
+        self._buffer += page["text"]
+        if len(self._buffer) < self.flush_chars:
+            return []
+        return self._split(final=False)
+
+    def finish(self) -> List[Dict]:
+        """Return the remaining chunks once every page has been added"""
+        if not self._buffer:
+            return []
+        return self._split(final=True)
+
+    def _split(self, final: bool) -> List[Dict]:
+        texts = self.text_splitter.split_text(self._buffer)
+        if not texts:
+            self._buffer = ""
+            return []
+
+        positions = []
+        search_from = 0
+        for text in texts:
+            # Chunks appear in buffer order, so each one is found at or after the previous start
+            position = self._buffer.find(text, search_from)
+            if position == -1:
+                position = search_from
+            positions.append(position)
+            search_from = position + 1
+
+        # The last chunk may still grow with the next page; it is split again together with that text
+        emit = len(texts) if final else len(texts) - 1
+        chunks = [self._make_chunk(texts[i], self._buffer_start + positions[i]) for i in range(emit)]
+
+        if final:
+            self._buffer = ""
+        else:
+            self._buffer_start += positions[-1]
+            self._buffer = self._buffer[positions[-1]:]
+        return chunks
+
+    def _make_chunk(self, text: str, start_offset: int) -> Dict:
+        page_index = max(0, bisect.bisect_right(self._page_starts, start_offset) - 1)
+        chunk = {
+            "text": text,
+            "chunk_index": self._next_chunk_index,
+            "page_number": self._page_numbers[page_index] if self._page_numbers else 1,
+            "start_offset": start_offset
+        }
+        self._next_chunk_index += 1
+        return chunk
@@ -0,0 +1,176 @@
+import os
+import json
+import time
+import uuid
+import sqlite3
+import asyncio
+import logging
+import tempfile
+from typing import Dict, Optional, Set
+
+from services.document_processor import DocumentProcessor
+from services.executors import run_io
+from services.sqlite_store import SQLiteStore
+
+logger = logging.getLogger(__name__)
+
+FINISHED_STATUSES = ("completed", "failed", "cancelled")
+
+class IngestionJobStore(SQLiteStore):
+    def __init__(self, db_path: str):
+        """SQLite record of ingestion jobs, so any worker on the host can report a job another worker runs"""
+        super().__init__(db_path)
+
+    def _create_schema(self, connection: sqlite3.Connection):
+        """Create the jobs table if it does not exist"""
+        connection.execute(
+            """
+            CREATE TABLE IF NOT EXISTS ingestion_jobs (
+                job_id TEXT PRIMARY KEY,
+                status TEXT NOT NULL,
+                document_id TEXT,
+                error TEXT,
+                progress TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL
+            )
+            """
+        )
+        connection.execute("CREATE INDEX IF NOT EXISTS ingestion_jobs_updated_at ON ingestion_jobs (updated_at)")
+
+    def save(self, job: Dict):
+        """Insert or update a job"""
+        with self._connect() as connection:
+            connection.execute(
+                """
+                INSERT OR REPLACE INTO ingestion_jobs
+                    (job_id, status, document_id, error, progress, created_at, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                """,
+                (
+                    job["job_id"], job["status"], job["document_id"], job["error"],
+                    json.dumps(job["progress"]), job["created_at"], job["updated_at"]
+                )
+            )
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        """Return a job by id, or None if unknown"""
+        with self._connect() as connection:
+            row = connection.execute("SELECT * FROM ingestion_jobs WHERE job_id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        job = dict(row)
+        job["progress"] = json.loads(job["progress"])
+        return job
+
+    def prune(self, max_retained_jobs: int):
+        """Forget the oldest finished jobs beyond the retention limit"""
+        with self._connect() as connection:
+            connection.execute(
+                f"""
+                DELETE FROM ingestion_jobs WHERE job_id IN (
+                    SELECT job_id FROM ingestion_jobs
+                    WHERE status IN ({", ".join("?" for _ in FINISHED_STATUSES)})
+                    ORDER BY updated_at ASC
+                    LIMIT MAX(0, (SELECT COUNT(*) FROM ingestion_jobs) - ?)
+                )
+                """,
+                (*FINISHED_STATUSES, max_retained_jobs)
+            )
+
+class IngestionJobManager:
+    def __init__(self, document_processor: DocumentProcessor, max_retained_jobs: int = 1000):
+        """Run document ingestion in the background and track its status for polling.
+
+        Jobs are kept in a SQLite store shared by all workers on the host; the worker running a job
+        writes its progress there every INGESTION_JOB_PROGRESS_INTERVAL seconds.
+        """
+        self.document_processor = document_processor
+        self.max_retained_jobs = max_retained_jobs
+        self.progress_interval = float(os.getenv("INGESTION_JOB_PROGRESS_INTERVAL", 1.0))
+        self.store = IngestionJobStore(
+            os.getenv("INGESTION_JOBS_PATH", os.path.join(tempfile.gettempdir(), "hackrx", "jobs.db"))
+        )
+        # Jobs running in this process, with live progress
+        self.jobs: Dict[str, Dict] = {}
+        self._tasks: Set[asyncio.Task] = set()
+
+    async def submit(self, url: str) -> Dict:
+        """Enqueue ingestion of a document URL and return the new job"""
+        now = time.time()
+        job = {
+            "job_id": uuid.uuid4().hex,
+            "status": "queued",
+            "document_id": None,
+            "error": None,
+            "progress": {
+                "stage": "queued",
+                "pages_extracted": 0,
+                "chunks_total": 0,
+                "chunks_embedded": 0,
+                "vectors_upserted": 0
+            },
+            "created_at": now,
+            "updated_at": now
+        }
+        self.jobs[job["job_id"]] = job
+        await run_io(self.store.save, job)
+        await run_io(self.store.prune, self.max_retained_jobs)
+
+        task = asyncio.create_task(self._run(job, url))
+        # Keep a reference so the task is not garbage collected mid-flight
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        logger.info(f"Queued ingestion job {job['job_id']}")
+        return job
+
+    async def get(self, job_id: str) -> Optional[Dict]:
+        """Return a job by id, or None if unknown"""
+        job = self.jobs.get(job_id)
+        if job is not None:
+            return job
+        return await run_io(self.store.get, job_id)
+
+    async def _save_progress(self, job: Dict, finished: asyncio.Event):
+        """Write the job to the store every progress_interval seconds, and once more when it finishes"""
+        while True:
+            last = finished.is_set()
+            job["updated_at"] = time.time()
+            try:
+                await run_io(self.store.save, job)
+            except Exception as e:
+                logger.error(f"Error saving ingestion job {job['job_id']}: {str(e)}")
+            if last:
+                return
+            try:
+                await asyncio.wait_for(finished.wait(), self.progress_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _run(self, job: Dict, url: str):
+        """Ingest the document, recording the outcome on the job"""
+        job["status"] = "running"
+        finished = asyncio.Event()
+        # A single writer per job, so a slow progress write can never land after the final state
+        writer = asyncio.create_task(self._save_progress(job, finished))
+        try:
+            job["document_id"] = await self.document_processor.process_document(url, progress=job["progress"])
+            job["status"] = "completed"
+        except asyncio.CancelledError:
+            job["status"] = "cancelled"
+            raise
+        except Exception as e:
+            logger.error(f"Ingestion job {job['job_id']} failed: {str(e)}")
+            job["status"] = "failed"
+            job["error"] = str(e)
+        finally:
+            job["document_id"] = job["document_id"] or job["progress"].get("document_id")
+            finished.set()
+            await writer
+            self.jobs.pop(job["job_id"], None)
+
+    async def shutdown(self):
+        """Cancel jobs that are still running"""
+        for task in list(self._tasks):
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
@@ -0,0 +1,105 @@
+import os
+import time
+import uuid
+import asyncio
+import logging
+import tempfile
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+from dotenv import load_dotenv
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+class IngestionLock:
+    """Cross-worker lock around document ingestion; the base class does no locking"""
+
+    @asynccontextmanager
+    async def hold(self, key: str) -> AsyncIterator[None]:
+        """Hold the lock for key for the duration of the context"""
+        yield
+
+class FileIngestionLock(IngestionLock):
+    def __init__(self, lock_dir: str, timeout: float, poll_interval: float = 0.2):
+        """Lock via flock() on one file per key, shared by all workers on the host"""
+        self.lock_dir = lock_dir
+        self.timeout = timeout
+        self.poll_interval = poll_interval
+        os.makedirs(self.lock_dir, exist_ok=True)
+
+    @asynccontextmanager
+    async def hold(self, key: str) -> AsyncIterator[None]:
+        import fcntl
+
+        path = os.path.join(self.lock_dir, f"{key}.lock")
+        fd = os.open(path, os.O_CREAT | os.O_RDWR, 0o644)
+        try:
+            # Poll with LOCK_NB instead of blocking a thread so waiting stays cancellable
+            deadline = time.monotonic() + self.timeout
+            while True:
+                try:
+                    fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    break
+                except BlockingIOError:
+                    if time.monotonic() >= deadline:
+                        raise TimeoutError(f"Timed out waiting for ingestion lock on {key}")
+                    await asyncio.sleep(self.poll_interval)
+            try:
+                yield
+            finally:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+        finally:
+            os.close(fd)
+
+class RedisIngestionLock(IngestionLock):
+    # Delete the key only if we still own it, so an expired lock re-acquired by another worker is left alone
+    RELEASE_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+end
+return 0
+"""
+
+    def __init__(self, redis_url: str, timeout: float, poll_interval: float = 0.2):
+        """Lock via SET NX PX in Redis, shared by workers on any host"""
+        try:
+            import redis.asyncio as redis_asyncio
+        except ImportError as e:
+            raise RuntimeError("INGEST_LOCK_BACKEND=redis requires the 'redis' package") from e
+
+        self.client = redis_asyncio.from_url(redis_url)
+        self.timeout = timeout
+        self.poll_interval = poll_interval
+
+    @asynccontextmanager
+    async def hold(self, key: str) -> AsyncIterator[None]:
+        lock_key = f"hackrx:ingest:{key}"
+        token = uuid.uuid4().hex
+        deadline = time.monotonic() + self.timeout
+        while not await self.client.set(lock_key, token, nx=True, px=int(self.timeout * 1000)):
+            if time.monotonic() >= deadline:
+                raise TimeoutError(f"Timed out waiting for ingestion lock on {key}")
+            await asyncio.sleep(self.poll_interval)
+        try:
+            yield
+        finally:
+            await self.client.eval(self.RELEASE_SCRIPT, 1, lock_key, token)
+
+def create_ingestion_lock() -> IngestionLock:
+    """Build the ingestion lock selected by INGEST_LOCK_BACKEND (file, redis or none)"""
+    backend = os.getenv("INGEST_LOCK_BACKEND", "file").lower()
+    timeout = float(os.getenv("INGEST_LOCK_TIMEOUT", 600))
+
+    if backend == "file":
+        lock_dir = os.getenv("INGEST_LOCK_DIR", os.path.join(tempfile.gettempdir(), "hackrx-locks"))
+        logger.info(f"Using file ingestion lock in {lock_dir}")
+        return FileIngestionLock(lock_dir, timeout)
+    if backend == "redis":
+        redis_url = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+        logger.info(f"Using Redis ingestion lock at {redis_url}")
+        return RedisIngestionLock(redis_url, timeout)
+    if backend == "none":
+        return IngestionLock()
+
+    raise ValueError(f"Unknown INGEST_LOCK_BACKEND: {backend}")
@@ -0,0 +1,51 @@
+import os
+import logging
+from typing import List, Optional
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+class OnnxEncoder:
+    def __init__(self, model_dir: str, model_file: str = "model_int8.onnx", max_seq_length: int = 384, threads: Optional[int] = None):
+        """Sentence encoder running an exported (optionally int8-quantized) transformer with ONNX Runtime.
+
+        Reproduces the all-mpnet-base-v2 sentence-transformers pipeline: tokenize, transformer,
+        attention-masked mean pooling, L2 normalization. model_dir is produced by export_onnx.py.
+        """
+        import onnxruntime as ort
+        from transformers import AutoTokenizer
+
+        self.model_path = os.path.join(model_dir, model_file)
+        self.max_seq_length = max_seq_length
+        self.tokenizer = AutoTokenizer.from_pretrained(model_dir)
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if threads:
+            options.intra_op_num_threads = threads
+        self.session = ort.InferenceSession(self.model_path, options, providers=["CPUExecutionProvider"])
+        self.input_names = {model_input.name for model_input in self.session.get_inputs()}
+        self.dimension = self.session.get_outputs()[0].shape[-1]
+        logger.info(f"Loaded ONNX encoder {self.model_path} (dimension {self.dimension})")
+
+    def encode(self, texts: List[str], batch_size: int = 32) -> np.ndarray:
+        """Encode texts into a (len(texts), dimension) float32 array of unit-length embeddings"""
+        embeddings = np.empty((len(texts), self.dimension), dtype=np.float32)
+        for start in range(0, len(texts), batch_size):
+            batch = texts[start:start + batch_size]
+            tokens = self.tokenizer(
+                batch,
+                padding=True,
+                truncation=True,
+                max_length=self.max_seq_length,
+                return_tensors="np"
+            )
+            inputs = {name: tokens[name].astype(np.int64) for name in self.input_names if name in tokens}
+            token_embeddings = self.session.run(None, inputs)[0]
+
+            # Mean over real tokens only, then normalize as the sentence-transformers Normalize module does
+            mask = tokens["attention_mask"][..., None].astype(np.float32)
+            pooled = (token_embeddings * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+            norms = np.linalg.norm(pooled, axis=1, keepdims=True)
+            embeddings[start:start + len(batch)] = pooled / np.clip(norms, 1e-12, None)
+        return embeddings
@@ -0,0 +1,83 @@
+import asyncio
+import logging
+from typing import Dict, List, Optional
+import numpy as np
+
+from services.vector_store import exact_top_k
+
+logger = logging.getLogger(__name__)
+
+class PartialIndex:
+    def __init__(self, document_id: str, dimension: int):
+        """In-memory index of a document's chunks as they are embedded, searchable before ingestion finishes.
+
+        Lives on the event loop: the ingestion pipeline adds batches and questions query it between adds.
+        """
+        self.document_id = document_id
+        self.dimension = dimension
+        self.complete = False
+        self.error: Optional[BaseException] = None
+
+        self._blocks: List[np.ndarray] = []
+        self._chunks: List[Dict] = []
+        self._matrix: Optional[np.ndarray] = None  # Concatenation of _blocks, rebuilt lazily after adds
+        self._version = 0
+        self._changed = asyncio.Event()
+
+    @property
+    def closed(self) -> bool:
+        return self.complete or self.error is not None
+
+    @property
+    def chunk_count(self) -> int:
+        return len(self._chunks)
+
+    @property
+    def version(self) -> int:
+        return self._version
+
+    def _notify(self):
+        self._version += 1
+        changed, self._changed = self._changed, asyncio.Event()
+        changed.set()
+
+    def add(self, chunks: List[Dict], embeddings: np.ndarray):
+        """Add a batch of embedded chunks"""
+        self._blocks.append(np.asarray(embeddings, dtype=np.float32))
+        self._chunks.extend(chunks)
+        self._matrix = None
+        self._notify()
+
+    def close(self, error: Optional[BaseException] = None):
+        """Mark the index complete (every chunk added) or failed, waking all waiters"""
+        if error is None:
+            self.complete = True
+        else:
+            self.error = error
+        self._notify()
+
+    async def wait_for_change(self, version: int) -> int:
+        """Wait until the index changes after `version` (or is closed); returns the new version"""
+        if self._version == version and not self.closed:
+            await self._changed.wait()
+        return self._version
+
+    def query(self, vector: np.ndarray, top_k: int) -> List[Dict]:
+        """Return up to top_k chunks ({'text', 'score', 'chunk_index', 'page_number', 'start_offset'}), best first"""
+        if not self._chunks:
+            return []
+        if self._matrix is None:
+            self._matrix = np.concatenate(self._blocks) if len(self._blocks) > 1 else self._blocks[0]
+            self._blocks = [self._matrix]
+
+        rows, scores = exact_top_k(self._matrix, np.asarray(vector, dtype=np.float32), top_k)
+        return [
+            {
+                "text": self._chunks[row]["text"],
+                "score": float(score),
+                "chunk_index": self._chunks[row]["chunk_index"],
+                "page_number": self._chunks[row]["page_number"],
+                "start_offset": self._chunks[row]["start_offset"]
+            }
+            for row, score in zip(rows.tolist(), scores.tolist())
+        ]
@@ -0,0 +1,29 @@
+import os
+import logging
+from typing import List
+from PyPDF2 import PdfReader
+
+logger = logging.getLogger(__name__)
+
+# Kept free of heavy imports: these functions run inside process pool workers, which are spawned
+# and import this module fresh.
+
+def warm_up() -> int:
+    """No-op run once per worker at startup so the import cost is paid before the first document"""
+    return os.getpid()
+
+def count_pages(pdf_path: str) -> int:
+    """Return the number of pages in a PDF file"""
+    with open(pdf_path, 'rb') as file:
+        return len(PdfReader(file).pages)
+
+def extract_page_range(pdf_path: str, start: int, end: int) -> List[str]:
+    """Extract the text of pages [start, end) from a PDF file"""
+    with open(pdf_path, 'rb') as file:
+        pdf_reader = PdfReader(file)
+        return [pdf_reader.pages[page_num].extract_text() for page_num in range(start, end)]
+
+def page_ranges(page_count: int, batch_size: int) -> List[tuple]:
+    """Split page indices into contiguous (start, end) ranges of at most batch_size pages, in order"""
+    batch_size = max(1, batch_size)
+    return [(start, min(start + batch_size, page_count)) for start in range(0, page_count, batch_size)]
@@ -1,35 +1,84 @@
 import os
+import asyncio
+import hashlib
+import tempfile
 import logging
-from typing import List, Dict
-from pinecone import Pinecone
-from sentence_transformers import SentenceTransformer
+from typing import AsyncIterator, List, Dict, Optional, Tuple
 import google.generativeai as genai
 import httpx
 import json
+import numpy as np
 from dotenv import load_dotenv
 
+from services.embedding_engine import EmbeddingEngine, get_embedding_engine, pad_embeddings
+from services.executors import run_io
+from services.vector_store import VectorStore, get_vector_store
+from services.embedding_cache import EmbeddingCache
+from services.answer_cache import AnswerCache
+from services.context_builder import ContextBuilder
+from services.partial_index import PartialIndex
+
 load_dotenv()
 
 logger = logging.getLogger(__name__)
 
 class QAService:
-    def __init__(self):
-        """Initialize the QA service with Google Gemini and Pinecone"""
+    def __init__(self, embedding_engine: Optional[EmbeddingEngine] = None, vector_store: Optional[VectorStore] = None):
+        """Initialize the QA service with Google Gemini, the shared embedding engine and the vector store"""
         self.google_api_key = os.getenv("GOOGLE_API_KEY")
-        self.pinecone_api_key = os.getenv("PINECONE_API_KEY")
-        self.pinecone_host = os.getenv("PINECONE_HOST")
-        self.pinecone_index_name = os.getenv("PINECONE_INDEX_NAME", "hackrx-documents")
         
-        # Initialize embeddings model (same as document processor)
-        self.embedding_model = SentenceTransformer('all-mpnet-base-v2')
-        self.embedding_dimension = 768
-        self.pinecone_dimension = 1024  # Match Pinecone index dimension
+        # Maximum number of questions answered concurrently per request
+        self.max_concurrent_questions = max(1, int(os.getenv("QA_MAX_CONCURRENCY", 5)))
+        
+        # Shared embeddings model (same instance as the document processor)
+        self.embedding_engine = embedding_engine or get_embedding_engine()
+        self.embedding_dimension = self.embedding_engine.dimension
+        
+        # Shared vector store (Pinecone or local)
+        self.vector_store = vector_store or get_vector_store(self.embedding_dimension)
+        
+        # Repeated questions skip the encoder; set QUESTION_CACHE_PATH to keep the cache across restarts
+        self.question_cache = EmbeddingCache(
+            max_entries=int(os.getenv("QUESTION_CACHE_MAX_ENTRIES", 10000)),
+            max_bytes=int(float(os.getenv("QUESTION_CACHE_MAX_MB", 64)) * 1024 * 1024),
+            persist_path=os.getenv("QUESTION_CACHE_PATH") or None,
+            model_signature=self.embedding_engine.signature()
+        )
         
         # Configure Google Gemini
         genai.configure(api_key=self.google_api_key)
+        self.gemini_model = os.getenv("GEMINI_MODEL", "gemini-2.0-flash")
+        self.generation_config = {
+            "temperature": 0.1,
+            "topK": 1,
+            "topP": 1,
+            "maxOutputTokens": 1000,
+            "stopSequences": []
+        }
+        
+        # Number of chunks retrieved per question
+        self.retrieval_top_k = int(os.getenv("RETRIEVAL_TOP_K", 8))
+        
+        # Retrieved chunks are merged and packed into at most this many prompt tokens
+        self.context_token_budget = int(os.getenv("CONTEXT_TOKEN_BUDGET", 4000))
+        self.context_builder = ContextBuilder(self.context_token_budget)
+        
+        # Grouped mode: questions with overlapping retrieved chunks share one JSON-mode Gemini call
+        self.grouped_mode = os.getenv("GEMINI_GROUPED_MODE", "false").lower() == "true"
+        self.group_max_questions = max(1, int(os.getenv("GEMINI_GROUP_MAX_QUESTIONS", 5)))
+        self.group_min_overlap = float(os.getenv("GEMINI_GROUP_MIN_OVERLAP", 0.5))
         
-        # Initialize Pinecone
-        self._init_pinecone()
+        # Early answering: questions for a new document are answered from its partially ingested chunks
+        # once the best match reaches EARLY_ANSWER_MIN_SCORE, or from all chunks once ingestion finishes
+        self.early_answering = os.getenv("EARLY_ANSWERING", "false").lower() == "true"
+        self.early_answer_min_score = float(os.getenv("EARLY_ANSWER_MIN_SCORE", 0.6))
+        
+        # Long-lived HTTP client for Gemini calls (created lazily, closed on shutdown)
+        self.http_client: Optional[httpx.AsyncClient] = None
+        self.gemini_http2 = os.getenv("GEMINI_HTTP2", "true").lower() == "true"
+        self.gemini_max_connections = int(os.getenv("GEMINI_MAX_CONNECTIONS", 20))
+        self.gemini_max_keepalive_connections = int(os.getenv("GEMINI_MAX_KEEPALIVE_CONNECTIONS", 10))
+        self.gemini_keepalive_expiry = float(os.getenv("GEMINI_KEEPALIVE_EXPIRY", 60.0))
         
         # Create system prompt
         self.system_prompt = """You are an expert assistant that answers questions based on the provided context from insurance policy documents.
@@ -42,56 +91,114 @@ Instructions:
 5. If there are multiple parts to a question, address each part
 6. Maintain a professional and clear tone
 7. Do not make assumptions or add information not present in the context"""
+        
+        # Answers are cached per (document, question, retrieval parameters, prompt version)
+        self.prompt_version = self._compute_prompt_version()
+        self.answer_cache_enabled = os.getenv("ANSWER_CACHE_ENABLED", "true").lower() == "true"
+        self.answer_cache = AnswerCache(
+            db_path=os.getenv("ANSWER_CACHE_PATH", os.path.join(tempfile.gettempdir(), "hackrx", "answers.db")),
+            ttl_seconds=float(os.getenv("ANSWER_CACHE_TTL_SECONDS", 7 * 24 * 3600)),
+            max_entries=int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", 50000))
+        )
+    
+    def _compute_prompt_version(self) -> str:
+        """Hash everything that shapes a generated answer, so prompt or model changes invalidate cached answers"""
+        fingerprint = json.dumps(
+            [
+                self.system_prompt,
+                self.gemini_model,
+                self.generation_config,
+                self.embedding_engine.model_name,
+                self.grouped_mode,
+                self.group_max_questions,
+                self.group_min_overlap,
+                self.context_token_budget
+            ],
+            sort_keys=True
+        )
+        return hashlib.sha256(fingerprint.encode("utf-8")).hexdigest()[:16]
+    
+    def _get_http_client(self) -> httpx.AsyncClient:
+        """Return the pooled Gemini HTTP client, creating it on first use"""
+        if self.http_client is None or self.http_client.is_closed:
+            self.http_client = httpx.AsyncClient(
+                http2=self.gemini_http2,
+                timeout=30.0,
+                limits=httpx.Limits(
+                    max_connections=self.gemini_max_connections,
+                    max_keepalive_connections=self.gemini_max_keepalive_connections,
+                    keepalive_expiry=self.gemini_keepalive_expiry
+                )
+            )
+            logger.info(
+                f"Created Gemini HTTP client (http2={self.gemini_http2}, "
+                f"max_connections={self.gemini_max_connections})"
+            )
+        return self.http_client
+    
+    async def aclose(self):
+        """Close the pooled Gemini HTTP client and persist caches"""
+        if self.http_client is not None:
+            await self.http_client.aclose()
+            self.http_client = None
+            logger.info("Gemini HTTP client closed")
+        self.question_cache.save()
     
-    def _init_pinecone(self):
-        """Initialize Pinecone connection"""
+    def cache_stats(self) -> Dict:
+        """Return hit/miss statistics for the QA caches"""
+        return {
+            "question_embeddings": self.question_cache.stats(),
+            "answers": self.answer_cache.stats()
+        }
+    
+    async def create_question_embeddings(self, questions: List[str]) -> np.ndarray:
+        """Create embeddings for questions in one batched encode and pad to match the vector store dimension"""
         try:
-            # Initialize Pinecone with modern client
-            pc = Pinecone(api_key=self.pinecone_api_key)
+            embeddings: List[Optional[np.ndarray]] = [self.question_cache.get(question) for question in questions]
+            missing = [i for i, embedding in enumerate(embeddings) if embedding is None]
             
-            # Connect to existing index using host
-            self.index = pc.Index(host=self.pinecone_host)
-            logger.info("Pinecone initialized successfully for QA service")
+            if missing:
+                # One encode request for every uncached question, batched with other concurrent requests
+                encoded = await self.embedding_engine.encode_async([questions[i] for i in missing])
+                for i, embedding in zip(missing, encoded):
+                    self.question_cache.put(questions[i], embedding)
+                    embeddings[i] = embedding
             
+            return pad_embeddings(np.stack(embeddings), self.vector_store.dimension)
         except Exception as e:
-            logger.error(f"Error initializing Pinecone in QA service: {str(e)}")
+            logger.error(f"Error creating question embeddings: {str(e)}")
             raise
     
-    def create_question_embedding(self, question: str) -> List[float]:
-        """Create embedding for the question and pad to match Pinecone dimension"""
-        try:
-            embedding = self.embedding_model.encode([question])
-            # Convert to regular float and pad with zeros to reach 1024 dimensions
-            embedding_list = [float(x) for x in embedding[0]]
-            padded = embedding_list + [0.0] * (self.pinecone_dimension - len(embedding_list))
-            return padded
-        except Exception as e:
-            logger.error(f"Error creating question embedding: {str(e)}")
-            raise
+    async def create_question_embedding(self, question: str) -> np.ndarray:
+        """Create embedding for the question and pad to match the vector store dimension"""
+        return (await self.create_question_embeddings([question]))[0]
     
-    async def retrieve_relevant_chunks(self, question: str, document_id: str, top_k: int = 5) -> List[Dict]:
-        """Retrieve relevant document chunks for the question"""
+    async def retrieve_relevant_chunks(
+        self,
+        question: str,
+        document_id: str,
+        top_k: int = 5,
+        question_embedding: Optional[np.ndarray] = None
+    ) -> List[Dict]:
+        """Retrieve relevant document chunks for the question, optionally with a precomputed embedding"""
         try:
             logger.info(f"Retrieving relevant chunks for question: {question[:100]}...")
             
             # Create embedding for the question
-            question_embedding = self.create_question_embedding(question)
-            
-            # Query Pinecone for similar chunks
-            results = self.index.query(
-                vector=question_embedding,
-                filter={"document_id": document_id},
-                top_k=top_k,
-                include_metadata=True,
-                include_values=False
-            )
+            if question_embedding is None:
+                question_embedding = await self.create_question_embedding(question)
+            
+            # Query the vector store for similar chunks
+            matches = await run_io(self.vector_store.query, question_embedding, document_id, top_k)
             
             relevant_chunks = []
-            for match in results['matches']:
+            for match in matches:
                 relevant_chunks.append({
                     'text': match['metadata']['text'],
                     'score': match['score'],
-                    'chunk_index': match['metadata']['chunk_index']
+                    'chunk_index': match['metadata']['chunk_index'],
+                    'page_number': match['metadata'].get('page_number'),
+                    'start_offset': match['metadata'].get('start_offset')
                 })
             
             logger.info(f"Retrieved {len(relevant_chunks)} relevant chunks")
@@ -101,107 +208,107 @@ Instructions:
             logger.error(f"Error retrieving relevant chunks: {str(e)}")
             raise
     
-    def expand_context(self, relevant_chunks: List[Dict], document_id: str) -> str:
-        """Expand context by combining relevant chunks"""
+    def expand_context(self, relevant_chunks: List[Dict], document_id: str, token_budget: Optional[int] = None) -> str:
+        """Expand context by merging overlapping chunks and packing them within the token budget"""
         try:
-            # Sort chunks by relevance score (highest first)
-            sorted_chunks = sorted(relevant_chunks, key=lambda x: x['score'], reverse=True)
-            
-            # Build context from chunks
-            context_parts = []
-            for chunk in sorted_chunks:
-                context_parts.append(chunk['text'])
-            
-            # Combine and return
-            context = "\n\n".join(context_parts)
-            return context
+            return self.context_builder.build(relevant_chunks, token_budget)
             
         except Exception as e:
             logger.error(f"Error expanding context: {str(e)}")
             # Fallback to basic context
             return "\n\n".join([chunk['text'] for chunk in relevant_chunks])
     
+    def _gemini_request(self, method: str, prompt: str, generation_config: Optional[Dict] = None) -> Tuple[str, Dict, Dict]:
+        """Build the URL, headers and payload for a Gemini model method"""
+        url = f"https://generativelanguage.googleapis.com/v1beta/models/{self.gemini_model}:{method}"
+        
+        headers = {
+            "Content-Type": "application/json",
+            "x-goog-api-key": self.google_api_key
+        }
+        
+        payload = {
+            "contents": [
+                {
+                    "parts": [
+                        {
+                            "text": prompt
+                        }
+                    ]
+                }
+            ],
+            "generationConfig": generation_config or self.generation_config,
+            "safetySettings": [
+                {
+                    "category": "HARM_CATEGORY_HARASSMENT",
+                    "threshold": "BLOCK_MEDIUM_AND_ABOVE"
+                },
+                {
+                    "category": "HARM_CATEGORY_HATE_SPEECH",
+                    "threshold": "BLOCK_MEDIUM_AND_ABOVE"
+                },
+                {
+                    "category": "HARM_CATEGORY_SEXUALLY_EXPLICIT",
+                    "threshold": "BLOCK_MEDIUM_AND_ABOVE"
+                },
+                {
+                    "category": "HARM_CATEGORY_DANGEROUS_CONTENT",
+                    "threshold": "BLOCK_MEDIUM_AND_ABOVE"
+                }
+            ]
+        }
+        return url, headers, payload
+    
+    async def _request_gemini(self, prompt: str, generation_config: Optional[Dict] = None) -> str:
+        """Call Google Gemini API directly using httpx, raising on failure"""
+        url, headers, payload = self._gemini_request("generateContent", prompt, generation_config)
+        
+        client = self._get_http_client()
+        response = await client.post(url, headers=headers, json=payload)
+        response.raise_for_status()
+        
+        result = response.json()
+        
+        if 'candidates' in result and len(result['candidates']) > 0:
+            candidate = result['candidates'][0]
+            if 'content' in candidate and 'parts' in candidate['content']:
+                text = candidate['content']['parts'][0].get('text', '').strip()
+                if text:
+                    return text
+        
+        logger.error(f"Unexpected Gemini API response format: {result}")
+        raise ValueError("Unable to generate response from Gemini API")
+    
+    async def _stream_gemini(self, prompt: str) -> AsyncIterator[str]:
+        """Stream answer text from Gemini's streamGenerateContent (server-sent events), raising on failure"""
+        url, headers, payload = self._gemini_request("streamGenerateContent", prompt)
+        
+        client = self._get_http_client()
+        async with client.stream("POST", url, params={"alt": "sse"}, headers=headers, json=payload) as response:
+            response.raise_for_status()
+            async for line in response.aiter_lines():
+                if not line.startswith("data:"):
+                    continue
+                result = json.loads(line[len("data:"):])
+                for candidate in result.get('candidates', [])[:1]:
+                    for part in candidate.get('content', {}).get('parts', []):
+                        if part.get('text'):
+                            yield part['text']
+    
     async def call_gemini_api(self, prompt: str) -> str:
-        """Call Google Gemini API directly using httpx"""
+        """Call Google Gemini API, returning an error message instead of raising"""
         try:
-            url = "https://generativelanguage.googleapis.com/v1beta/models/gemini-2.0-flash:generateContent"
-            
-            headers = {
-                "Content-Type": "application/json",
-                "x-goog-api-key": self.google_api_key
-            }
-            
-            payload = {
-                "contents": [
-                    {
-                        "parts": [
-                            {
-                                "text": prompt
-                            }
-                        ]
-                    }
-                ],
-                "generationConfig": {
-                    "temperature": 0.1,
-                    "topK": 1,
-                    "topP": 1,
-                    "maxOutputTokens": 1000,
-                    "stopSequences": []
-                },
-                "safetySettings": [
-                    {
-                        "category": "HARM_CATEGORY_HARASSMENT",
-                        "threshold": "BLOCK_MEDIUM_AND_ABOVE"
-                    },
-                    {
-                        "category": "HARM_CATEGORY_HATE_SPEECH",
-                        "threshold": "BLOCK_MEDIUM_AND_ABOVE"
-                    },
-                    {
-                        "category": "HARM_CATEGORY_SEXUALLY_EXPLICIT",
-                        "threshold": "BLOCK_MEDIUM_AND_ABOVE"
-                    },
-                    {
-                        "category": "HARM_CATEGORY_DANGEROUS_CONTENT",
-                        "threshold": "BLOCK_MEDIUM_AND_ABOVE"
-                    }
-                ]
-            }
-            
-            async with httpx.AsyncClient(timeout=30.0) as client:
-                response = await client.post(url, headers=headers, json=payload)
-                response.raise_for_status()
-                
-                result = response.json()
-                
-                if 'candidates' in result and len(result['candidates']) > 0:
-                    candidate = result['candidates'][0]
-                    if 'content' in candidate and 'parts' in candidate['content']:
-                        return candidate['content']['parts'][0]['text'].strip()
-                
-                logger.error(f"Unexpected Gemini API response format: {result}")
-                return "Error: Unable to generate response from Gemini API"
-                
+            return await self._request_gemini(prompt)
         except Exception as e:
             logger.error(f"Error calling Gemini API: {str(e)}")
             return f"Error processing question: {str(e)}"
     
-    async def answer_question(self, question: str, document_id: str) -> str:
-        """Answer a question using RAG with Gemini"""
-        try:
-            logger.info(f"Answering question for document {document_id}")
-            
-            # Retrieve relevant chunks
-            relevant_chunks = await self.retrieve_relevant_chunks(question, document_id, top_k=8)
-            
-            if not relevant_chunks:
-                return "The information is not available in the provided document."
-            
-            # Expand context with relevant chunks
-            context = self.expand_context(relevant_chunks, document_id)
-            
-            # Create the complete prompt
-            full_prompt = f"""{self.system_prompt}
+    def build_prompt(self, question: str, relevant_chunks: List[Dict], document_id: str) -> str:
+        """Create the complete single-question prompt from retrieved chunks"""
+        # Expand context with relevant chunks
+        context = self.expand_context(relevant_chunks, document_id)
+        
+        return f"""{self.system_prompt}
 
 Context from the document:
 {context}
@@ -209,31 +316,408 @@ Context from the document:
 Question: {question}
 
 Answer:"""
-            
-            # Generate answer using Gemini
-            logger.info("Generating answer with Gemini 2.0 Flash")
-            answer = await self.call_gemini_api(full_prompt)
-            
-            logger.info(f"Generated answer: {answer[:100]}...")
+    
+    async def answer_from_chunks(self, question: str, relevant_chunks: List[Dict], document_id: str) -> str:
+        """Generate an answer for one question from its retrieved chunks, raising on failure"""
+        if not relevant_chunks:
+            return "The information is not available in the provided document."
+        
+        full_prompt = self.build_prompt(question, relevant_chunks, document_id)
+        
+        # Generate answer using Gemini
+        logger.info(f"Generating answer with {self.gemini_model}")
+        answer = await self._request_gemini(full_prompt)
+        
+        logger.info(f"Generated answer: {answer[:100]}...")
+        return answer
+    
+    async def generate_answer(
+        self,
+        question: str,
+        document_id: str,
+        question_embedding: Optional[np.ndarray] = None
+    ) -> str:
+        """Answer a question using RAG with Gemini, raising on failure"""
+        logger.info(f"Answering question for document {document_id}")
+        
+        # Retrieve relevant chunks
+        relevant_chunks = await self.retrieve_relevant_chunks(
+            question, document_id, top_k=self.retrieval_top_k, question_embedding=question_embedding
+        )
+        return await self.answer_from_chunks(question, relevant_chunks, document_id)
+    
+    def group_questions(self, retrieved: Dict[int, List[Dict]]) -> List[List[int]]:
+        """Greedily group questions whose retrieved chunks mostly fall inside a group's existing context"""
+        groups: List[List[int]] = []
+        group_chunks: List[set] = []
+        for index, chunks in retrieved.items():
+            chunk_ids = {chunk['chunk_index'] for chunk in chunks}
+            placed = False
+            if chunk_ids:
+                for group, union in zip(groups, group_chunks):
+                    if len(group) >= self.group_max_questions or not union:
+                        continue
+                    if len(chunk_ids & union) / len(chunk_ids) >= self.group_min_overlap:
+                        group.append(index)
+                        union.update(chunk_ids)
+                        placed = True
+                        break
+            if not placed:
+                groups.append([index])
+                group_chunks.append(set(chunk_ids))
+        return groups
+    
+    @staticmethod
+    def _parse_json_answers(text: str, expected: int) -> Optional[List[str]]:
+        """Parse a JSON array of `expected` answer strings, tolerating a Markdown code fence"""
+        text = text.strip()
+        if text.startswith("```"):
+            text = text.strip("`")
+            if text.lower().startswith("json"):
+                text = text[4:]
+        try:
+            answers = json.loads(text)
+        except ValueError:
+            return None
+        if not isinstance(answers, list) or len(answers) != expected:
+            return None
+        if not all(isinstance(answer, str) for answer in answers):
+            return None
+        return [answer.strip() for answer in answers]
+    
+    async def answer_group(self, questions: List[str], chunk_lists: List[List[Dict]], document_id: str) -> List[str]:
+        """Answer several questions sharing context with one JSON-mode Gemini call, raising on failure"""
+        # The context builder de-duplicates chunks shared between the group's questions; each question
+        # brings its own share of the budget so none of them loses chunks it would have had alone
+        context = self.expand_context(
+            [chunk for chunks in chunk_lists for chunk in chunks],
+            document_id,
+            token_budget=self.context_token_budget * len(questions)
+        )
+        
+        numbered_questions = "\n".join(f"{i + 1}. {question}" for i, question in enumerate(questions))
+        full_prompt = f"""{self.system_prompt}
+
+Context from the document:
+{context}
+
+Answer each of the following questions using the context above. Respond with a JSON array of {len(questions)} strings where element i is the answer to question i, in the same order.
+
+Questions:
+{numbered_questions}"""
+        
+        generation_config = {
+            **self.generation_config,
+            "maxOutputTokens": min(8192, self.generation_config["maxOutputTokens"] * len(questions)),
+            "responseMimeType": "application/json",
+            "responseSchema": {"type": "ARRAY", "items": {"type": "STRING"}}
+        }
+        
+        logger.info(f"Generating {len(questions)} answers in one call with {self.gemini_model}")
+        text = await self._request_gemini(full_prompt, generation_config)
+        answers = self._parse_json_answers(text, len(questions))
+        if answers is None:
+            raise ValueError(f"Grouped Gemini response was not a JSON array of {len(questions)} strings")
+        return answers
+    
+    async def _lookup_cached_answer(self, question: str, document_id: str) -> Tuple[Optional[str], Optional[str]]:
+        """Return (cache_key, cached_answer); the key is None when caching is disabled"""
+        if not self.answer_cache_enabled:
+            return None, None
+        cache_key = self.answer_cache.make_key(
+            document_id, question, {"top_k": self.retrieval_top_k}, self.prompt_version
+        )
+        try:
+            return cache_key, await run_io(self.answer_cache.get, cache_key)
+        except Exception as e:
+            logger.error(f"Error reading answer cache: {str(e)}")
+            return cache_key, None
+    
+    async def _generate_and_cache(
+        self,
+        question: str,
+        document_id: str,
+        cache_key: Optional[str],
+        question_embedding: Optional[np.ndarray] = None
+    ) -> str:
+        """Generate an answer and cache it; errors are returned as messages and never cached"""
+        try:
+            answer = await self.generate_answer(question, document_id, question_embedding)
+            if cache_key is not None:
+                await run_io(self.answer_cache.put, cache_key, answer)
             return answer
             
         except Exception as e:
             logger.error(f"Error answering question: {str(e)}")
             return f"Error processing question: {str(e)}"
     
-    async def answer_multiple_questions(self, questions: List[str], document_id: str) -> List[str]:
-        """Answer multiple questions for a document"""
+    async def answer_question_with_cache_info(self, question: str, document_id: str) -> Tuple[str, bool]:
+        """Answer a question, serving it from the answer cache when possible; returns (answer, cache_hit)"""
+        cache_key, cached = await self._lookup_cached_answer(question, document_id)
+        if cached is not None:
+            logger.info(f"Answer cache hit for document {document_id}")
+            return cached, True
+        return await self._generate_and_cache(question, document_id, cache_key), False
+    
+    async def answer_question(self, question: str, document_id: str) -> str:
+        """Answer a question using RAG with Gemini"""
+        answer, _ = await self.answer_question_with_cache_info(question, document_id)
+        return answer
+    
+    async def _answer_pending(
+        self,
+        questions: List[str],
+        pending: List[int],
+        document_id: str,
+        embeddings: List[Optional[np.ndarray]]
+    ) -> Dict[int, object]:
+        """Retrieve and answer uncached questions; returns index -> answer string or the exception raised"""
+        semaphore = asyncio.Semaphore(self.max_concurrent_questions)
+        outcomes: Dict[int, object] = {}
+        
+        async def retrieve_with_limit(index: int, question_embedding: Optional[np.ndarray]) -> List[Dict]:
+            async with semaphore:
+                logger.info(f"Processing question {index + 1}/{len(questions)}: {questions[index][:100]}...")
+                return await self.retrieve_relevant_chunks(
+                    questions[index], document_id, top_k=self.retrieval_top_k, question_embedding=question_embedding
+                )
+        
+        # return_exceptions keeps one failing question from cancelling the others
+        retrievals = await asyncio.gather(
+            *(retrieve_with_limit(i, embedding) for i, embedding in zip(pending, embeddings)),
+            return_exceptions=True
+        )
+        retrieved: Dict[int, List[Dict]] = {}
+        for i, chunks in zip(pending, retrievals):
+            if isinstance(chunks, BaseException):
+                outcomes[i] = chunks
+            else:
+                retrieved[i] = chunks
+        
+        groups = self.group_questions(retrieved) if self.grouped_mode else [[i] for i in retrieved]
+        
+        async def answer_one(index: int):
+            async with semaphore:
+                try:
+                    outcomes[index] = await self.answer_from_chunks(questions[index], retrieved[index], document_id)
+                except Exception as e:
+                    outcomes[index] = e
+        
+        async def answer_with_fallback(group: List[int]):
+            if len(group) > 1:
+                try:
+                    async with semaphore:
+                        answers = await self.answer_group(
+                            [questions[i] for i in group], [retrieved[i] for i in group], document_id
+                        )
+                    outcomes.update(zip(group, answers))
+                    return
+                except Exception as e:
+                    logger.error(f"Grouped answering failed, falling back to per-question calls: {str(e)}")
+            await asyncio.gather(*(answer_one(i) for i in group))
+        
+        if self.grouped_mode:
+            logger.info(f"Answering {len(retrieved)} questions in {len(groups)} Gemini calls")
+        await asyncio.gather(*(answer_with_fallback(group) for group in groups))
+        return outcomes
+    
+    async def answer_multiple_questions_with_cache_info(self, questions: List[str], document_id: str) -> List[Dict]:
+        """Answer multiple questions concurrently, preserving order; each result is {'answer', 'cached'}"""
         try:
-            logger.info(f"Answering {len(questions)} questions for document {document_id}")
+            logger.info(
+                f"Answering {len(questions)} questions for document {document_id} "
+                f"(concurrency limit: {self.max_concurrent_questions})"
+            )
+            
+            # Serve cached answers first so only the misses are embedded and sent to Gemini
+            lookups = await asyncio.gather(
+                *(self._lookup_cached_answer(question, document_id) for question in questions)
+            )
+            results: List[Optional[Dict]] = [
+                {"answer": cached, "cached": True} if cached is not None else None
+                for _, cached in lookups
+            ]
+            pending = [i for i, result in enumerate(results) if result is None]
+            logger.info(f"{len(questions) - len(pending)} answers served from cache")
             
-            answers = []
-            for i, question in enumerate(questions):
-                logger.info(f"Processing question {i+1}/{len(questions)}")
-                answer = await self.answer_question(question, document_id)
-                answers.append(answer)
+            if pending:
+                # Encode every uncached question in one batch, then fan out retrieval and generation
+                try:
+                    embeddings = await self.create_question_embeddings([questions[i] for i in pending])
+                except Exception as e:
+                    logger.error(f"Batched question embedding failed, embedding per question: {str(e)}")
+                    embeddings = [None] * len(pending)
+                
+                outcomes = await self._answer_pending(questions, pending, document_id, embeddings)
+                
+                cache_writes = []
+                for i in pending:
+                    answer = outcomes.get(i, RuntimeError("Question was not answered"))
+                    if isinstance(answer, BaseException):
+                        logger.error(f"Error answering question {i + 1}: {str(answer)}")
+                        answer = f"Error processing question: {str(answer)}"
+                    elif lookups[i][0] is not None:
+                        # Only successful answers are cached
+                        cache_writes.append(run_io(self.answer_cache.put, lookups[i][0], answer))
+                    results[i] = {"answer": answer, "cached": False}
+                
+                for write in await asyncio.gather(*cache_writes, return_exceptions=True):
+                    if isinstance(write, BaseException):
+                        logger.error(f"Error writing answer cache: {str(write)}")
             
-            return answers
+            return results
             
         except Exception as e:
             logger.error(f"Error answering multiple questions: {str(e)}")
-            raise
\ No newline at end of file
+            raise
+    
+    async def answer_multiple_questions(self, questions: List[str], document_id: str) -> List[str]:
+        """Answer multiple questions for a document concurrently, preserving question order"""
+        results = await self.answer_multiple_questions_with_cache_info(questions, document_id)
+        return [result["answer"] for result in results]
+    
+    async def _retrieve_early(self, index: PartialIndex, question_embedding: np.ndarray) -> Optional[Tuple[List[Dict], bool]]:
+        """Wait until a partial index holds a good enough match (or is complete).
+        
+        Returns (chunks, whether the index was complete when they were retrieved), or None if ingestion failed.
+        """
+        version = index.version
+        while True:
+            relevant_chunks = index.query(question_embedding, self.retrieval_top_k)
+            if index.error is not None:
+                return None
+            if index.complete:
+                return relevant_chunks, True
+            if relevant_chunks and relevant_chunks[0]["score"] >= self.early_answer_min_score:
+                logger.info(
+                    f"Answering early from {index.chunk_count} indexed chunks "
+                    f"(best score {relevant_chunks[0]['score']:.3f})"
+                )
+                return relevant_chunks, False
+            version = await index.wait_for_change(version)
+    
+    async def answer_multiple_questions_during_ingestion(
+        self,
+        questions: List[str],
+        ingestion: "asyncio.Task[str]",
+        index_ready: "asyncio.Future[PartialIndex]"
+    ) -> Tuple[str, List[Dict]]:
+        """Answer questions while their document is still being ingested; returns (document_id, results).
+        
+        Question embeddings are computed during download. If ingestion publishes a partial index through
+        index_ready, each question is answered as soon as it has a strong enough match; otherwise (the
+        document was already ingested) this falls back to the regular path. Results are {'answer', 'cached'}.
+        """
+        embeddings_task = asyncio.ensure_future(self.create_question_embeddings(questions))
+        try:
+            await asyncio.wait({ingestion, index_ready}, return_when=asyncio.FIRST_COMPLETED)
+            if not index_ready.done():
+                document_id = await ingestion
+                # The batched encode above has filled the question cache
+                await asyncio.gather(embeddings_task, return_exceptions=True)
+                return document_id, await self.answer_multiple_questions_with_cache_info(questions, document_id)
+            
+            index = index_ready.result()
+            embeddings = await embeddings_task
+            semaphore = asyncio.Semaphore(self.max_concurrent_questions)
+            
+            async def answer_one(i: int) -> Optional[Dict]:
+                retrieved = await self._retrieve_early(index, embeddings[i])
+                if retrieved is None:
+                    return None
+                relevant_chunks, complete = retrieved
+                try:
+                    async with semaphore:
+                        answer = await self.answer_from_chunks(questions[i], relevant_chunks, index.document_id)
+                    # Answers from a partial index may differ from the full-document answer; only cache the
+                    # latter. The index may complete while Gemini answers, so judge by retrieval time.
+                    if complete:
+                        cache_key, _ = await self._lookup_cached_answer(questions[i], index.document_id)
+                        if cache_key is not None:
+                            await run_io(self.answer_cache.put, cache_key, answer)
+                except Exception as e:
+                    logger.error(f"Error answering question {i + 1}: {str(e)}")
+                    answer = f"Error processing question: {str(e)}"
+                return {"answer": answer, "cached": False}
+            
+            results = await asyncio.gather(*(answer_one(i) for i in range(len(questions))))
+            # Surfaces the ingestion error when the partial index failed
+            document_id = await ingestion
+            return document_id, results
+        finally:
+            # The ingestion itself is shielded by single-flight; this only stops waiting on it
+            for task in (embeddings_task, ingestion):
+                if not task.done():
+                    task.cancel()
+    
+    async def stream_answers(
+        self,
+        questions: List[str],
+        document_id: str,
+        stream_tokens: bool = False
+    ) -> AsyncIterator[Dict]:
+        """Yield each answer as soon as it is ready, in completion order.
+        
+        Events are {'index', 'answer', 'cached'}; with stream_tokens, {'index', 'delta'} events
+        carry Gemini output as it arrives before the question's final answer event.
+        Grouped mode is not used here since it would hold answers back until the whole group is done.
+        """
+        queue: asyncio.Queue = asyncio.Queue()
+        
+        lookups = await asyncio.gather(
+            *(self._lookup_cached_answer(question, document_id) for question in questions)
+        )
+        for i, (_, cached) in enumerate(lookups):
+            if cached is not None:
+                yield {"index": i, "answer": cached, "cached": True}
+        pending = [i for i, (_, cached) in enumerate(lookups) if cached is None]
+        if not pending:
+            return
+        
+        try:
+            embeddings = await self.create_question_embeddings([questions[i] for i in pending])
+        except Exception as e:
+            logger.error(f"Batched question embedding failed, embedding per question: {str(e)}")
+            embeddings = [None] * len(pending)
+        
+        semaphore = asyncio.Semaphore(self.max_concurrent_questions)
+        
+        async def answer_one(index: int, question_embedding: Optional[np.ndarray]):
+            cache_key = lookups[index][0]
+            try:
+                async with semaphore:
+                    relevant_chunks = await self.retrieve_relevant_chunks(
+                        questions[index], document_id, top_k=self.retrieval_top_k, question_embedding=question_embedding
+                    )
+                    if not relevant_chunks:
+                        answer = "The information is not available in the provided document."
+                    elif stream_tokens:
+                        parts = []
+                        async for delta in self._stream_gemini(self.build_prompt(questions[index], relevant_chunks, document_id)):
+                            parts.append(delta)
+                            await queue.put({"index": index, "delta": delta})
+                        answer = "".join(parts).strip()
+                        if not answer:
+                            raise ValueError("Gemini stream produced no text")
+                    else:
+                        answer = await self.answer_from_chunks(questions[index], relevant_chunks, document_id)
+                if cache_key is not None:
+                    await run_io(self.answer_cache.put, cache_key, answer)
+            except Exception as e:
+                logger.error(f"Error answering question {index + 1}: {str(e)}")
+                answer = f"Error processing question: {str(e)}"
+            await queue.put({"index": index, "answer": answer, "cached": False})
+        
+        tasks = [asyncio.create_task(answer_one(i, embedding)) for i, embedding in zip(pending, embeddings)]
+        try:
+            remaining = len(tasks)
+            while remaining:
+                event = await queue.get()
+                if "answer" in event:
+                    remaining -= 1
+                yield event
+        finally:
+            # The client may disconnect mid-stream; stop work nobody will read
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
@@ -0,0 +1,34 @@
+import asyncio
+import logging
+from typing import Awaitable, Callable, Dict, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+class SingleFlight:
+    def __init__(self):
+        """Track in-flight tasks so concurrent callers with the same key share one execution"""
+        self._tasks: Dict[str, asyncio.Task] = {}
+
+    def in_flight(self, key: str) -> bool:
+        """Return True if a task for the key is currently running"""
+        return key in self._tasks
+
+    async def do(self, key: str, func: Callable[[], Awaitable[T]]) -> T:
+        """Run func() once per key; callers arriving while it runs await the same result"""
+        task = self._tasks.get(key)
+        if task is None:
+            task = asyncio.ensure_future(func())
+            self._tasks[key] = task
+            task.add_done_callback(lambda finished: self._forget(key, finished))
+        else:
+            logger.info(f"Joining in-flight task for {key}")
+
+        # Shield so a cancelled caller (e.g. client disconnect) does not cancel the shared work
+        return await asyncio.shield(task)
+
+    def _forget(self, key: str, task: asyncio.Task):
+        """Drop the finished task so later calls start fresh"""
+        if self._tasks.get(key) is task:
+            del self._tasks[key]
@@ -0,0 +1,24 @@
+import os
+import sqlite3
+
+class SQLiteStore:
+    def __init__(self, db_path: str):
+        """Base for the small SQLite stores shared by every worker on the host; subclasses define _create_schema"""
+        self.db_path = db_path
+        directory = os.path.dirname(self.db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as connection:
+            # WAL lets readers in other workers proceed while one worker writes
+            connection.execute("PRAGMA journal_mode=WAL")
+            self._create_schema(connection)
+
+    def _connect(self) -> sqlite3.Connection:
+        """Open a short-lived connection; cheap for SQLite and safe across threads and processes"""
+        connection = sqlite3.connect(self.db_path, timeout=30.0)
+        connection.row_factory = sqlite3.Row
+        return connection
+
+    def _create_schema(self, connection: sqlite3.Connection):
+        """Create the store's tables if they do not exist"""
+        raise NotImplementedError
@@ -0,0 +1,276 @@
+import os
+import json
+import logging
+import tempfile
+import threading
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from dotenv import load_dotenv
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+def exact_top_k(matrix: np.ndarray, vector: np.ndarray, top_k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Exact dot-product search returning (row indices, scores) best first"""
+    scores = matrix @ vector
+    k = min(top_k, scores.shape[0])
+    if k == 0:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+    candidates = np.argpartition(-scores, k - 1)[:k]
+    order = candidates[np.argsort(-scores[candidates])]
+    return order, scores[order]
+
+class VectorStore(ABC):
+    """Interface for storing chunk embeddings and running per-document similarity search.
+
+    All methods are blocking; callers run them on the I/O executor.
+    """
+
+    dimension: int
+    # Identifies the backend and index, so local bookkeeping about stored documents is kept per store
+    namespace: str
+
+    @abstractmethod
+    def upsert(self, document_id: str, ids: List[str], embeddings: np.ndarray, metadatas: List[Dict]):
+        """Store a batch of vectors belonging to one document"""
+
+    def finalize_document(self, document_id: str):
+        """Called once every vector of a document has been upserted"""
+        pass
+
+    def abort_document(self, document_id: str):
+        """Called when ingesting a document fails, to drop anything buffered for it"""
+        pass
+
+    @abstractmethod
+    def query(self, vector: np.ndarray, document_id: str, top_k: int) -> List[Dict]:
+        """Return up to top_k matches ({'id', 'score', 'metadata'}) within a document, best first"""
+
+    @abstractmethod
+    def has_document(self, document_id: str) -> bool:
+        """Return True if vectors for the document are stored"""
+
+class PineconeVectorStore(VectorStore):
+    def __init__(self, api_key: Optional[str], host: Optional[str], dimension: int):
+        """Connect to an existing Pinecone index by host"""
+        from pinecone import Pinecone
+
+        self.dimension = dimension
+        self.namespace = f"pinecone:{host}"
+        try:
+            # Initialize Pinecone with modern client
+            pc = Pinecone(api_key=api_key)
+
+            # Connect to existing index using host
+            self.index = pc.Index(host=host)
+            logger.info("Pinecone initialized successfully")
+
+        except Exception as e:
+            logger.error(f"Error initializing Pinecone: {str(e)}")
+            raise
+
+    def upsert(self, document_id: str, ids: List[str], embeddings: np.ndarray, metadatas: List[Dict]):
+        # Serialize to Python floats only for the batch being sent
+        vectors = [
+            {"id": vector_id, "values": values, "metadata": metadata}
+            for vector_id, values, metadata in zip(ids, embeddings.tolist(), metadatas)
+        ]
+        self.index.upsert(vectors=vectors)
+
+    def query(self, vector: np.ndarray, document_id: str, top_k: int) -> List[Dict]:
+        results = self.index.query(
+            vector=vector.tolist(),
+            filter={"document_id": document_id},
+            top_k=top_k,
+            include_metadata=True,
+            include_values=False
+        )
+        return [
+            {"id": match["id"], "score": match["score"], "metadata": match["metadata"]}
+            for match in results["matches"]
+        ]
+
+    def has_document(self, document_id: str) -> bool:
+        # Query for any vector with this document_id
+        results = self.index.query(
+            vector=[0.0] * self.dimension,  # Dummy vector with correct dimension
+            filter={"document_id": document_id},
+            top_k=1,
+            include_metadata=True
+        )
+        return len(results["matches"]) > 0
+
+class LocalVectorStore(VectorStore):
+    def __init__(self, directory: str, dimension: int, ann_min_vectors: int = 5000, max_loaded_documents: int = 64):
+        """Per-document float32 matrices on local disk, memory-mapped and searched by exact dot product"""
+        self.directory = directory
+        self.dimension = dimension
+        self.namespace = f"local:{os.path.abspath(directory)}"
+        self.ann_min_vectors = ann_min_vectors
+        self.max_loaded_documents = max(1, max_loaded_documents)
+        os.makedirs(self.directory, exist_ok=True)
+
+        self._lock = threading.Lock()
+        # Vectors of documents still being ingested, keyed by document then vector id
+        self._pending: Dict[str, Dict[str, Tuple[np.ndarray, Dict]]] = {}
+        # LRU of loaded documents: (matrix, ids, metadatas, optional ANN index); each holds a memory map,
+        # its id and metadata lists and possibly an HNSW index, so only max_loaded_documents are kept open
+        self._loaded: "OrderedDict[str, Tuple[np.ndarray, List[str], List[Dict], Optional[object]]]" = OrderedDict()
+
+    def _path(self, document_id: str, suffix: str) -> str:
+        return os.path.join(self.directory, f"{document_id}{suffix}")
+
+    def upsert(self, document_id: str, ids: List[str], embeddings: np.ndarray, metadatas: List[Dict]):
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+        with self._lock:
+            pending = self._pending.setdefault(document_id, {})
+            for vector_id, vector, metadata in zip(ids, embeddings, metadatas):
+                pending[vector_id] = (vector, metadata)
+
+    def finalize_document(self, document_id: str):
+        with self._lock:
+            pending = self._pending.pop(document_id, {})
+        if not pending:
+            return
+
+        # Keep rows in chunk order so the matrix layout is deterministic
+        items = sorted(pending.items(), key=lambda item: item[1][1].get("chunk_index", 0))
+        ids = [vector_id for vector_id, _ in items]
+        metadatas = [metadata for _, (_, metadata) in items]
+        matrix = np.stack([vector for _, (vector, _) in items]).astype(np.float32, copy=False)
+
+        # Write to temporary names and rename so readers in other workers never see partial files
+        self._atomic_write(self._path(document_id, ".npy"), lambda f: np.save(f, matrix))
+        self._atomic_write(
+            self._path(document_id, ".json"),
+            lambda f: f.write(json.dumps({"ids": ids, "metadatas": metadatas}).encode("utf-8"))
+        )
+        if len(ids) >= self.ann_min_vectors:
+            self._build_ann_index(document_id, matrix)
+
+        with self._lock:
+            self._loaded.pop(document_id, None)
+        logger.info(f"Stored {len(ids)} vectors for document {document_id} in local vector store")
+
+    def abort_document(self, document_id: str):
+        with self._lock:
+            pending = self._pending.pop(document_id, {})
+        if pending:
+            logger.info(f"Discarded {len(pending)} pending vectors of failed document {document_id}")
+
+    def _atomic_write(self, path: str, write):
+        fd, temp_path = tempfile.mkstemp(dir=self.directory)
+        try:
+            with os.fdopen(fd, "wb") as f:
+                write(f)
+            os.replace(temp_path, path)
+        except Exception:
+            if os.path.exists(temp_path):
+                os.unlink(temp_path)
+            raise
+
+    def _build_ann_index(self, document_id: str, matrix: np.ndarray):
+        """Build an HNSW index for large documents when hnswlib is installed"""
+        try:
+            import hnswlib
+        except ImportError:
+            logger.info("hnswlib not installed; large documents use exact search")
+            return
+
+        index = hnswlib.Index(space="ip", dim=matrix.shape[1])
+        index.init_index(max_elements=matrix.shape[0], ef_construction=200, M=16)
+        index.add_items(matrix, np.arange(matrix.shape[0]))
+        temp_path = self._path(document_id, ".hnsw.tmp")
+        index.save_index(temp_path)
+        os.replace(temp_path, self._path(document_id, ".hnsw"))
+
+    def _load(self, document_id: str) -> Optional[Tuple[np.ndarray, List[str], List[Dict], Optional[object]]]:
+        with self._lock:
+            loaded = self._loaded.get(document_id)
+            if loaded is not None:
+                self._loaded.move_to_end(document_id)
+        if loaded is not None:
+            return loaded
+
+        matrix_path = self._path(document_id, ".npy")
+        if not os.path.exists(matrix_path):
+            return None
+
+        matrix = np.load(matrix_path, mmap_mode="r")
+        with open(self._path(document_id, ".json"), "r", encoding="utf-8") as f:
+            data = json.load(f)
+
+        ann_index = None
+        if os.path.exists(self._path(document_id, ".hnsw")):
+            try:
+                import hnswlib
+
+                ann_index = hnswlib.Index(space="ip", dim=matrix.shape[1])
+                ann_index.load_index(self._path(document_id, ".hnsw"), max_elements=matrix.shape[0])
+                ann_index.set_ef(max(64, matrix.shape[0] // 100))
+            except ImportError:
+                ann_index = None
+
+        loaded = (matrix, data["ids"], data["metadatas"], ann_index)
+        with self._lock:
+            self._loaded[document_id] = loaded
+            while len(self._loaded) > self.max_loaded_documents:
+                self._loaded.popitem(last=False)
+        return loaded
+
+    def query(self, vector: np.ndarray, document_id: str, top_k: int) -> List[Dict]:
+        vector = np.asarray(vector, dtype=np.float32)
+        loaded = self._load(document_id)
+        if loaded is None:
+            return []
+
+        matrix, ids, metadatas, ann_index = loaded
+        if ann_index is not None:
+            labels, distances = ann_index.knn_query(vector, k=min(top_k, matrix.shape[0]))
+            # hnswlib's inner-product distance is 1 - dot
+            rows, scores = labels[0], 1.0 - distances[0]
+        else:
+            rows, scores = exact_top_k(matrix, vector, top_k)
+
+        return [
+            {"id": ids[row], "score": float(score), "metadata": metadatas[row]}
+            for row, score in zip(rows.tolist(), scores.tolist())
+        ]
+
+    def has_document(self, document_id: str) -> bool:
+        return os.path.exists(self._path(document_id, ".json"))
+
+_store: Optional[VectorStore] = None
+_store_lock = threading.Lock()
+
+def get_vector_store(embedding_dimension: int) -> VectorStore:
+    """Return the process-wide vector store selected by VECTOR_STORE_BACKEND (pinecone or local)"""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                backend = os.getenv("VECTOR_STORE_BACKEND", "pinecone").lower()
+                if backend == "pinecone":
+                    _store = PineconeVectorStore(
+                        api_key=os.getenv("PINECONE_API_KEY"),
+                        host=os.getenv("PINECONE_HOST"),
+                        # Embeddings are zero-padded to the index dimension; set to 768 for an unpadded index
+                        dimension=int(os.getenv("PINECONE_DIMENSION", 1024))
+                    )
+                elif backend == "local":
+                    directory = os.getenv(
+                        "LOCAL_VECTOR_STORE_DIR", os.path.join(tempfile.gettempdir(), "hackrx", "vectors")
+                    )
+                    logger.info(f"Using local vector store in {directory}")
+                    _store = LocalVectorStore(
+                        directory,
+                        dimension=embedding_dimension,
+                        ann_min_vectors=int(os.getenv("LOCAL_ANN_MIN_VECTORS", 5000)),
+                        max_loaded_documents=int(os.getenv("LOCAL_VECTOR_STORE_MAX_LOADED", 64))
+                    )
+                else:
+                    raise ValueError(f"Unknown VECTOR_STORE_BACKEND: {backend}")
+    return _store
@@ -0,0 +1,97 @@
+import asyncio
+import hashlib
+import os
+import tempfile
+from typing import List
+
+import numpy as np
+import pytest
+
+from services.vector_store import LocalVectorStore
+
+class FakeEmbeddingEngine:
+    """Deterministic stand-in for EmbeddingEngine: unit vectors derived from a hash of the text"""
+
+    model_name = "fake"
+    dimension = 8
+
+    def signature(self) -> str:
+        return f"{self.model_name}|{self.dimension}"
+
+    def encode(self, texts: List[str], batch_size=None) -> np.ndarray:
+        rows = []
+        for text in texts:
+            seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:4], "little")
+            vector = np.random.default_rng(seed).standard_normal(self.dimension).astype(np.float32)
+            rows.append(vector / np.linalg.norm(vector))
+        return np.stack(rows) if rows else np.empty((0, self.dimension), dtype=np.float32)
+
+    async def encode_async(self, texts: List[str], batch_size=None) -> np.ndarray:
+        return self.encode(texts, batch_size)
+
+@pytest.fixture
+def embedding_engine():
+    return FakeEmbeddingEngine()
+
+@pytest.fixture
+def local_store(tmp_path):
+    return LocalVectorStore(str(tmp_path / "vectors"), dimension=FakeEmbeddingEngine.dimension)
+
+@pytest.fixture
+def processor(tmp_path, monkeypatch, embedding_engine, local_store):
+    monkeypatch.setenv("DOCUMENT_REGISTRY_PATH", str(tmp_path / "documents.db"))
+    monkeypatch.setenv("INGEST_LOCK_BACKEND", "none")
+    from services.document_processor import DocumentProcessor
+
+    return DocumentProcessor(embedding_engine, local_store)
+
+@pytest.fixture
+def fake_downloads(processor):
+    """Replace the processor's network download with in-memory bodies per URL; returns a log of every request made"""
+
+    def install(bodies, validators=None):
+        requests = []
+
+        async def download_pdf(url, etag=None, last_modified=None):
+            requests.append({"url": url, "etag": etag, "last_modified": last_modified})
+            await asyncio.sleep(0.01)
+            body = bodies[url]
+            served = (validators or {}).get(url, {})
+            if (etag and etag == served.get("etag")) or (last_modified and last_modified == served.get("last_modified")):
+                return None
+            fd, path = tempfile.mkstemp(suffix=".pdf")
+            with os.fdopen(fd, "wb") as f:
+                f.write(body)
+            return {
+                "path": path,
+                "content_hash": hashlib.sha256(body).hexdigest(),
+                "etag": served.get("etag"),
+                "last_modified": served.get("last_modified")
+            }
+
+        processor.download_pdf = download_pdf
+        return requests
+
+    return install
+
+@pytest.fixture
+def fake_pages(processor):
+    """Replace PDF extraction with the given page texts"""
+
+    def install(page_texts):
+        async def iter_page_texts(pdf_path):
+            for text in page_texts:
+                await asyncio.sleep(0)
+                yield text
+
+        processor.iter_page_texts = iter_page_texts
+
+    return install
+
+@pytest.fixture
+def qa_service(tmp_path, monkeypatch, embedding_engine, local_store):
+    monkeypatch.setenv("ANSWER_CACHE_PATH", str(tmp_path / "answers.db"))
+    monkeypatch.delenv("QUESTION_CACHE_PATH", raising=False)
+    from services.qa_service import QAService
+
+    return QAService(embedding_engine, local_store)
@@ -0,0 +1,50 @@
+import time
+
+from services.answer_cache import AnswerCache
+
+def make_cache(tmp_path, ttl_seconds=3600, max_entries=100):
+    return AnswerCache(str(tmp_path / "answers.db"), ttl_seconds=ttl_seconds, max_entries=max_entries)
+
+def test_key_ignores_question_case_and_whitespace():
+    params = {"top_k": 8}
+    key = AnswerCache.make_key("doc", "What is  the grace period?", params, "v1")
+
+    assert key == AnswerCache.make_key("doc", " what is the GRACE period? ", params, "v1")
+    assert key != AnswerCache.make_key("doc", "What is the grace period?", params, "v2")
+    assert key != AnswerCache.make_key("other", "What is the grace period?", params, "v1")
+
+def test_answers_persist_across_instances(tmp_path):
+    make_cache(tmp_path).put("key", "thirty days")
+
+    cache = make_cache(tmp_path)
+    assert cache.get("key") == "thirty days"
+    assert cache.get("missing") is None
+    assert cache.stats() == {"hits": 1, "misses": 1, "hit_rate": 0.5}
+
+def test_expired_answers_are_not_returned(tmp_path, monkeypatch):
+    cache = make_cache(tmp_path, ttl_seconds=60)
+    cache.put("key", "thirty days")
+
+    now = time.time()
+    monkeypatch.setattr(time, "time", lambda: now + 61)
+    assert cache.get("key") is None
+
+def test_least_recently_used_answers_are_evicted(tmp_path, monkeypatch):
+    cache = make_cache(tmp_path, max_entries=2)
+    clock = iter(range(1000, 2000))
+    monkeypatch.setattr(time, "time", lambda: next(clock))
+
+    cache.put("a", "1")
+    cache.put("b", "2")
+    assert cache.get("a") == "1"  # b is now the least recently used
+    cache.put("c", "3")
+
+    assert cache.get("a") == "1"
+    assert cache.get("b") is None
+    assert cache.get("c") == "3"
+
+def test_empty_answers_are_not_stored(tmp_path):
+    cache = make_cache(tmp_path)
+    cache.put("key", "  ")
+
+    assert cache.get("key") is None
@@ -0,0 +1,68 @@
+import pytest
+
+from services.context_builder import ContextBuilder
+
+@pytest.fixture
+def builder():
+    builder = ContextBuilder(token_budget=100)
+    # Character estimate (4 chars per token) keeps the tests independent of the tiktoken download
+    builder.encoding = None
+    return builder
+
+def chunk(index, text, score, start_offset=None):
+    return {"chunk_index": index, "text": text, "score": score, "start_offset": start_offset}
+
+def test_overlapping_chunks_merge_by_offset(builder):
+    document = "abcdefghijklmnopqrstuvwxyz"
+    spans = builder.merge_chunks([
+        chunk(1, document[8:20], 0.5, start_offset=8),
+        chunk(0, document[0:12], 0.9, start_offset=0),
+    ])
+
+    assert len(spans) == 1
+    assert spans[0]["text"] == document[0:20]
+    assert spans[0]["score"] == 0.9
+
+def test_distant_chunks_stay_separate(builder):
+    spans = builder.merge_chunks([
+        chunk(0, "first part", 0.4, start_offset=0),
+        chunk(5, "later part", 0.8, start_offset=5000),
+    ])
+
+    assert [span["text"] for span in spans] == ["first part", "later part"]
+
+def test_chunks_without_offsets_merge_on_textual_overlap(builder):
+    spans = builder.merge_chunks([
+        chunk(0, "the grace period is thirty days", 0.7),
+        chunk(1, "thirty days after the due date", 0.6),
+    ])
+
+    assert len(spans) == 1
+    assert spans[0]["text"] == "the grace period is thirty days after the due date"
+
+def test_duplicate_chunks_keep_the_best_score(builder):
+    spans = builder.merge_chunks([chunk(3, "same", 0.2), chunk(3, "same", 0.6)])
+
+    assert len(spans) == 1
+    assert spans[0]["score"] == 0.6
+
+def test_build_orders_by_score_within_budget(builder):
+    context = builder.build([
+        chunk(0, "a" * 200, 0.3, start_offset=0),
+        chunk(10, "b" * 200, 0.9, start_offset=10000),
+        chunk(20, "c" * 200, 0.5, start_offset=20000),
+    ])
+
+    # 100 tokens is 400 characters: the two best spans fit, the weakest is dropped
+    assert context == "b" * 200 + "\n\n" + "c" * 200
+
+def test_build_accepts_a_larger_budget(builder):
+    chunks = [chunk(i * 10, str(i) * 200, 1.0 - i / 10, start_offset=i * 10000) for i in range(3)]
+
+    assert len(builder.build(chunks).split("\n\n")) == 2
+    assert len(builder.build(chunks, token_budget=300).split("\n\n")) == 3
+
+def test_build_truncates_a_single_oversized_span(builder):
+    context = builder.build([chunk(0, "x" * 1000, 0.9, start_offset=0)])
+
+    assert context == "x" * 400
@@ -0,0 +1,71 @@
+import asyncio
+
+BLOB = "https://example.blob.core.windows.net/assets/policy.pdf"
+
+def test_url_key_strips_only_signature_parameters(processor):
+    signed = f"{BLOB}?sv=2023-01-03&st=2025-07-04T09%3A11%3A24Z&se=2027-07-05&sr=b&sp=r&sig=abc"
+    resigned = f"{BLOB}?sv=2023-01-03&st=2025-08-01T00%3A00%3A00Z&se=2027-08-01&sr=b&sp=r&sig=xyz"
+
+    assert processor.generate_url_key(signed) == BLOB
+    assert processor.generate_url_key(signed) == processor.generate_url_key(resigned)
+    assert processor.generate_url_key("https://h/get?doc=1") != processor.generate_url_key("https://h/get?doc=2")
+    assert processor.generate_url_key("https://h/get?b=2&a=1") == processor.generate_url_key("https://h/get?a=1&b=2")
+
+
+def test_different_query_documents_resolve_to_different_ids(processor, fake_downloads, fake_pages):
+    fake_pages(["some text " * 50])
+    fake_downloads({"https://h/get?doc=1": b"document one", "https://h/get?doc=2": b"document two"})
+
+    async def main():
+        return await asyncio.gather(
+            processor.process_document("https://h/get?doc=1"),
+            processor.process_document("https://h/get?doc=2")
+        )
+
+    first, second = asyncio.run(main())
+    assert first != second
+
+
+def test_concurrent_requests_for_one_url_share_a_download(processor, fake_downloads, fake_pages):
+    fake_pages(["some text " * 50])
+    requests = fake_downloads({BLOB: b"policy"})
+
+    async def main():
+        return await asyncio.gather(*(processor.process_document(BLOB) for _ in range(4)))
+
+    assert len(set(asyncio.run(main()))) == 1
+    assert len(requests) == 1
+
+
+def test_if_modified_since_is_only_sent_to_the_url_it_came_from(processor, fake_downloads, fake_pages):
+    fake_pages(["some text " * 50])
+    date = "Mon, 01 Jan 2024 00:00:00 GMT"
+    requests = fake_downloads(
+        {"https://h/get?doc=1": b"document one", "https://h/get?doc=2": b"document two"},
+        validators={"https://h/get?doc=1": {"last_modified": date}}
+    )
+
+    first = asyncio.run(processor.process_document("https://h/get?doc=1"))
+    again = asyncio.run(processor.process_document("https://h/get?doc=1"))
+
+    assert again == first
+    assert requests[-1] == {"url": "https://h/get?doc=1", "etag": None, "last_modified": date}
+
+    # Same path with a different document: no alias is shared, so no validator may be sent
+    second = asyncio.run(processor.process_document("https://h/get?doc=2"))
+    assert second != first
+    assert requests[-1]["last_modified"] is None
+
+
+def test_resigned_url_revalidates_with_etag_only(processor, fake_downloads, fake_pages):
+    fake_pages(["some text " * 50])
+    signed = f"{BLOB}?sv=1&sig=abc"
+    resigned = f"{BLOB}?sv=1&sig=xyz"
+    validators = {"etag": '"0x1"', "last_modified": "Mon, 01 Jan 2024 00:00:00 GMT"}
+    requests = fake_downloads({signed: b"policy", resigned: b"policy"}, validators={signed: validators, resigned: validators})
+
+    first = asyncio.run(processor.process_document(signed))
+    second = asyncio.run(processor.process_document(resigned))
+
+    assert second == first
+    assert requests[-1] == {"url": resigned, "etag": '"0x1"', "last_modified": None}
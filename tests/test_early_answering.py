@@ -0,0 +1,79 @@
+import asyncio
+
+import pytest
+
+from services.partial_index import PartialIndex
+
+QUESTION = "What is the grace period?"
+
+def answer_during_ingestion(qa_service, index, on_answer):
+    """Run early answering against `index`, calling on_answer(index) in place of the Gemini call"""
+
+    async def answer_from_chunks(question, relevant_chunks, document_id):
+        await asyncio.sleep(0)
+        on_answer(index)
+        return f"answer from {len(relevant_chunks)} chunks"
+
+    qa_service.answer_from_chunks = answer_from_chunks
+
+    async def main():
+        index_ready = asyncio.get_running_loop().create_future()
+        index_ready.set_result(index)
+
+        async def ingestion():
+            await asyncio.sleep(0.05)
+            index.close()
+            return index.document_id
+
+        return await qa_service.answer_multiple_questions_during_ingestion(
+            [QUESTION], asyncio.ensure_future(ingestion()), index_ready
+        )
+
+    return asyncio.run(main())
+
+def cached_answer(qa_service, document_id):
+    return asyncio.run(qa_service._lookup_cached_answer(QUESTION, document_id))[1]
+
+def indexed_question(embedding_engine):
+    # The question's own embedding as a chunk guarantees a match above EARLY_ANSWER_MIN_SCORE
+    index = PartialIndex("doc", embedding_engine.dimension)
+    chunk = {"text": QUESTION, "chunk_index": 0, "page_number": 1, "start_offset": 0}
+    index.add([chunk], embedding_engine.encode([QUESTION]))
+    return index
+
+def test_early_answer_is_not_cached_when_ingestion_completes_during_generation(qa_service, embedding_engine):
+    index = indexed_question(embedding_engine)
+
+    document_id, results = answer_during_ingestion(qa_service, index, on_answer=lambda index: index.close())
+
+    assert document_id == "doc"
+    assert results == [{"answer": "answer from 1 chunks", "cached": False}]
+    assert cached_answer(qa_service, "doc") is None
+
+def test_answer_from_a_complete_index_is_cached(qa_service, embedding_engine):
+    index = indexed_question(embedding_engine)
+    index.close()
+
+    answer_during_ingestion(qa_service, index, on_answer=lambda index: None)
+
+    assert cached_answer(qa_service, "doc") == "answer from 1 chunks"
+
+def test_failed_ingestion_surfaces_its_error(qa_service, embedding_engine):
+    index = PartialIndex("doc", embedding_engine.dimension)
+
+    async def main():
+        index_ready = asyncio.get_running_loop().create_future()
+        index_ready.set_result(index)
+
+        async def ingestion():
+            await asyncio.sleep(0.01)
+            error = RuntimeError("corrupt page")
+            index.close(error)
+            raise error
+
+        return await qa_service.answer_multiple_questions_during_ingestion(
+            [QUESTION], asyncio.ensure_future(ingestion()), index_ready
+        )
+
+    with pytest.raises(RuntimeError, match="corrupt page"):
+        asyncio.run(main())
@@ -0,0 +1,56 @@
+import asyncio
+import threading
+
+import numpy as np
+
+from services.embedding_batcher import EmbeddingBatcher
+
+def recording_encoder():
+    """Encode each text as [len(text)], recording every call; the first call waits for `release`"""
+    calls = []
+    release = threading.Event()
+
+    def encode(texts):
+        if not calls:
+            release.wait(5)
+        calls.append(list(texts))
+        return np.array([[len(text)] for text in texts], dtype=np.float32)
+
+    return encode, calls, release
+
+def test_concurrent_small_requests_share_one_encode():
+    encode, calls, release = recording_encoder()
+    release.set()
+
+    async def main():
+        batcher = EmbeddingBatcher(encode, window_ms=20, max_batch_texts=100)
+        try:
+            return await asyncio.gather(*(batcher.encode(["q" * i]) for i in range(1, 4)))
+        finally:
+            await batcher.aclose()
+
+    results = asyncio.run(main())
+    assert [result[:, 0].tolist() for result in results] == [[1.0], [2.0], [3.0]]
+    assert len(calls) == 1
+
+def test_questions_are_encoded_ahead_of_queued_ingestion_batches():
+    encode, calls, release = recording_encoder()
+    large = [[f"{name}{i}" for i in range(5)] for name in ("a", "b", "c")]
+
+    async def main():
+        batcher = EmbeddingBatcher(encode, window_ms=1, max_batch_texts=100, priority_max_texts=2)
+        try:
+            first = asyncio.ensure_future(batcher.encode(large[0]))
+            await asyncio.sleep(0.05)  # The first ingestion batch is now being encoded
+            rest = [asyncio.ensure_future(batcher.encode(texts)) for texts in large[1:]]
+            question = asyncio.ensure_future(batcher.encode(["question"]))
+            await asyncio.sleep(0.05)
+            release.set()
+            await asyncio.gather(first, question, *rest)
+            return question.result()
+        finally:
+            await batcher.aclose()
+
+    question_embedding = asyncio.run(main())
+    assert question_embedding[:, 0].tolist() == [8.0]
+    assert calls == [large[0], ["question"], large[1], large[2]]
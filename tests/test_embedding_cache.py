@@ -0,0 +1,55 @@
+import numpy as np
+
+from services.embedding_cache import EmbeddingCache
+
+def vector(value, dimension=8):
+    return np.full(dimension, value, dtype=np.float32)
+
+def test_lookups_ignore_case_and_whitespace():
+    cache = EmbeddingCache(max_entries=10, max_bytes=1 << 20)
+    cache.put("What is  the grace period?", vector(1.0))
+
+    assert np.array_equal(cache.get(" what is the GRACE period? "), vector(1.0))
+    assert cache.get("something else") is None
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+
+def test_entry_cap_evicts_least_recently_used():
+    cache = EmbeddingCache(max_entries=2, max_bytes=1 << 20)
+    cache.put("a", vector(1.0))
+    cache.put("b", vector(2.0))
+    cache.get("a")
+    cache.put("c", vector(3.0))
+
+    assert cache.get("b") is None
+    assert cache.get("a") is not None and cache.get("c") is not None
+
+def test_byte_cap_evicts_until_under_budget():
+    cache = EmbeddingCache(max_entries=100, max_bytes=2 * vector(0.0).nbytes)
+    for i in range(5):
+        cache.put(str(i), vector(float(i)))
+
+    assert cache.stats()["entries"] == 2
+    assert cache.stats()["bytes"] == 2 * vector(0.0).nbytes
+    assert cache.get("0") is None and cache.get("4") is not None
+
+def test_cache_persists_across_restarts(tmp_path):
+    path = str(tmp_path / "questions.npz")
+    cache = EmbeddingCache(max_entries=10, max_bytes=1 << 20, persist_path=path, model_signature="model|torch|8")
+    cache.put("a", vector(1.0))
+    cache.put("b", vector(2.0))
+    cache.save()
+
+    restored = EmbeddingCache(max_entries=10, max_bytes=1 << 20, persist_path=path, model_signature="model|torch|8")
+    assert np.array_equal(restored.get("b"), vector(2.0))
+    assert restored.stats()["entries"] == 2
+
+def test_cache_saved_for_another_model_is_discarded(tmp_path):
+    path = str(tmp_path / "questions.npz")
+    cache = EmbeddingCache(max_entries=10, max_bytes=1 << 20, persist_path=path, model_signature="model|torch|8")
+    cache.put("a", vector(1.0))
+    cache.save()
+
+    for signature in ("model|onnx|model_int8.onnx|8", "other|torch|8"):
+        restored = EmbeddingCache(max_entries=10, max_bytes=1 << 20, persist_path=path, model_signature=signature)
+        assert restored.get("a") is None
+        assert restored.stats()["entries"] == 0
@@ -0,0 +1,61 @@
+import numpy as np
+
+from services.embedding_engine import EmbeddingEngine
+
+class FakeModel:
+    """Tokenizes on whitespace and encodes a text as [word count, 0, ...], recording each forward pass"""
+
+    max_seq_length = 64
+
+    def __init__(self):
+        self.batches = []
+
+    def tokenizer(self, texts, add_special_tokens=True, truncation=True, max_length=None):
+        return {"input_ids": [[0] * min(len(text.split()) + 2, max_length) for text in texts]}
+
+    def encode(self, texts, batch_size=None):
+        self.batches.append(list(texts))
+        embeddings = np.zeros((len(texts), 4), dtype=np.float32)
+        embeddings[:, 0] = [len(text.split()) for text in texts]
+        return embeddings
+
+def make_engine(batch_size=32, token_budget=8192):
+    # Skip __init__ so no real model is loaded
+    engine = EmbeddingEngine.__new__(EmbeddingEngine)
+    engine.backend = "onnx"
+    engine.model = FakeModel()
+    engine.batch_size = batch_size
+    engine.token_budget = token_budget
+    return engine
+
+def test_batches_are_sorted_longest_first():
+    engine = make_engine(batch_size=2)
+
+    assert engine.plan_batches([5, 30, 10, 20]) == [[1, 3], [2, 0]]
+
+def test_batches_respect_the_padded_token_budget():
+    engine = make_engine(batch_size=32, token_budget=100)
+
+    batches = engine.plan_batches([40, 40, 40, 10, 10, 10, 10])
+
+    assert batches == [[0, 1], [2, 3], [4, 5, 6]]
+    lengths = [40, 40, 40, 10, 10, 10, 10]
+    assert all(len(batch) * lengths[batch[0]] <= 100 for batch in batches)
+
+def test_text_longer_than_the_budget_is_encoded_alone():
+    engine = make_engine(token_budget=10)
+
+    assert engine.plan_batches([50, 5]) == [[0], [1]]
+
+def test_bucketed_encode_restores_input_order():
+    engine = make_engine(batch_size=2)
+    texts = ["one", "one two three four five", "one two", "one two three four", "one two three"]
+
+    embeddings = engine.encode_bucketed(texts)
+
+    assert embeddings[:, 0].tolist() == [1, 5, 2, 4, 3]
+    assert engine.model.batches == [
+        ["one two three four five", "one two three four"],
+        ["one two three", "one two"],
+        ["one"]
+    ]
@@ -0,0 +1,32 @@
+from services.qa_service import QAService
+
+def chunks(*indexes):
+    return [{"chunk_index": i, "text": f"chunk {i}"} for i in indexes]
+
+def test_questions_with_overlapping_chunks_share_a_group(qa_service):
+    qa_service.group_min_overlap = 0.5
+    retrieved = {0: chunks(1, 2, 3), 1: chunks(2, 3, 9), 2: chunks(7, 8), 3: chunks(1, 9)}
+
+    assert qa_service.group_questions(retrieved) == [[0, 1, 3], [2]]
+
+def test_groups_respect_the_size_limit(qa_service):
+    qa_service.group_max_questions = 2
+    retrieved = {i: chunks(1, 2) for i in range(5)}
+
+    assert qa_service.group_questions(retrieved) == [[0, 1], [2, 3], [4]]
+
+def test_questions_without_chunks_are_answered_alone(qa_service):
+    retrieved = {0: [], 1: chunks(1), 2: []}
+
+    assert qa_service.group_questions(retrieved) == [[0], [1], [2]]
+
+def test_json_answers_are_parsed_with_or_without_a_code_fence():
+    assert QAService._parse_json_answers('["a", " b "]', 2) == ["a", "b"]
+    assert QAService._parse_json_answers('```json\n["a", "b"]\n```', 2) == ["a", "b"]
+    assert QAService._parse_json_answers('```\n["a"]\n```', 1) == ["a"]
+
+def test_malformed_json_answers_are_rejected():
+    assert QAService._parse_json_answers("not json", 1) is None
+    assert QAService._parse_json_answers('["a"]', 2) is None
+    assert QAService._parse_json_answers('{"answer": "a"}', 1) is None
+    assert QAService._parse_json_answers('["a", 2]', 2) is None
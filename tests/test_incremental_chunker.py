@@ -0,0 +1,70 @@
+import random
+
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+
+from services.incremental_chunker import IncrementalChunker
+
+def make_pages(seed, page_count):
+    rng = random.Random(seed)
+    words = ["policy", "premium", "cover", "waiting", "period", "claim", "insured", "benefit"]
+    pages = []
+    offset = 0
+    for page_number in range(1, page_count + 1):
+        paragraphs = [
+            " ".join(rng.choice(words) for _ in range(rng.randint(5, 120)))
+            for _ in range(rng.randint(1, 6))
+        ]
+        text = f"\n--- Page {page_number} ---\n" + "\n\n".join(paragraphs)
+        pages.append({"page_number": page_number, "text": text, "start_offset": offset})
+        offset += len(text)
+    return pages
+
+def chunk_pages(pages, flush_chars=8000):
+    splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=200, length_function=len)
+    chunker = IncrementalChunker(splitter, flush_chars=flush_chars)
+    chunks = []
+    for page in pages:
+        chunks.extend(chunker.add_page(page))
+    chunks.extend(chunker.finish())
+    return chunks
+
+def test_offsets_and_page_numbers_are_exact():
+    for seed in range(10):
+        pages = make_pages(seed, page_count=15)
+        document = "".join(page["text"] for page in pages)
+        page_starts = [page["start_offset"] for page in pages]
+
+        chunks = chunk_pages(pages)
+
+        assert [chunk["chunk_index"] for chunk in chunks] == list(range(len(chunks)))
+        for chunk in chunks:
+            start = chunk["start_offset"]
+            assert document[start:start + len(chunk["text"])] == chunk["text"]
+            expected_page = max(i for i, page_start in enumerate(page_starts) if page_start <= start) + 1
+            assert chunk["page_number"] == expected_page
+
+def test_chunks_cover_the_document_in_order():
+    pages = make_pages(seed=42, page_count=20)
+    document = "".join(page["text"] for page in pages)
+
+    chunks = chunk_pages(pages)
+
+    assert chunks[0]["start_offset"] <= len(document) - len(document.lstrip())
+    for previous, chunk in zip(chunks, chunks[1:]):
+        # Each chunk starts after its predecessor and no text between them is skipped
+        assert previous["start_offset"] < chunk["start_offset"]
+        gap = document[previous["start_offset"] + len(previous["text"]):chunk["start_offset"]]
+        assert gap.strip() == ""
+    last = chunks[-1]
+    assert document[last["start_offset"] + len(last["text"]):].strip() == ""
+
+def test_chunks_respect_the_splitter_size():
+    chunks = chunk_pages(make_pages(seed=7, page_count=10), flush_chars=3000)
+
+    assert chunks
+    assert all(len(chunk["text"]) <= 1000 for chunk in chunks)
+
+def test_finish_without_pages_returns_nothing():
+    splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=200)
+
+    assert IncrementalChunker(splitter, flush_chars=8000).finish() == []
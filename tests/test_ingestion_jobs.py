@@ -0,0 +1,74 @@
+import asyncio
+
+import pytest
+
+from services.ingestion_jobs import IngestionJobManager
+
+BLOB = "https://example.blob.core.windows.net/assets/policy.pdf"
+
+@pytest.fixture
+def jobs_path(tmp_path, monkeypatch):
+    monkeypatch.setenv("INGESTION_JOBS_PATH", str(tmp_path / "jobs.db"))
+    monkeypatch.setenv("INGESTION_JOB_PROGRESS_INTERVAL", "0.01")
+
+async def wait_until_finished(manager, job_id):
+    while True:
+        job = await manager.get(job_id)
+        if job["status"] not in ("queued", "running"):
+            return job
+        await asyncio.sleep(0.01)
+
+def test_job_submitted_in_one_worker_is_visible_from_another(jobs_path, processor, fake_downloads, fake_pages):
+    fake_pages(["some text " * 50])
+    fake_downloads({BLOB: b"policy"})
+
+    async def main():
+        worker, other_worker = IngestionJobManager(processor), IngestionJobManager(processor)
+        job = await worker.submit(BLOB)
+        assert (await other_worker.get(job["job_id"]))["status"] in ("queued", "running")
+        await wait_until_finished(worker, job["job_id"])
+        return await other_worker.get(job["job_id"])
+
+    job = asyncio.run(main())
+    assert job["status"] == "completed"
+    assert processor.registry.get(job["document_id"]) is not None
+    assert job["progress"]["stage"] == "completed"
+    assert job["progress"]["vectors_upserted"] == job["progress"]["chunks_total"] > 0
+
+def test_failed_job_records_its_error(jobs_path, processor, fake_downloads):
+    fake_downloads({BLOB: b"policy"})
+
+    async def failing_pages(pdf_path):
+        raise RuntimeError("corrupt page")
+        yield
+
+    processor.iter_page_texts = failing_pages
+
+    async def main():
+        job = await IngestionJobManager(processor).submit(BLOB)
+        return await wait_until_finished(IngestionJobManager(processor), job["job_id"])
+
+    job = asyncio.run(main())
+    assert job["status"] == "failed"
+    assert job["error"] == "corrupt page"
+
+def test_cancelled_job_is_recorded_on_shutdown(jobs_path, processor, fake_downloads):
+    fake_downloads({BLOB: b"policy"})
+
+    async def slow_pages(pdf_path):
+        await asyncio.sleep(60)
+        yield "never"
+
+    processor.iter_page_texts = slow_pages
+
+    async def main():
+        worker = IngestionJobManager(processor)
+        job = await worker.submit(BLOB)
+        await asyncio.sleep(0.05)
+        await worker.shutdown()
+        return await IngestionJobManager(processor).get(job["job_id"])
+
+    assert asyncio.run(main())["status"] == "cancelled"
+
+def test_unknown_job_is_none(jobs_path, processor):
+    assert asyncio.run(IngestionJobManager(processor).get("missing")) is None
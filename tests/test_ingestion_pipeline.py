@@ -0,0 +1,35 @@
+import asyncio
+
+import pytest
+
+BLOB = "https://example.blob.core.windows.net/assets/policy.pdf"
+
+def test_pipeline_ingests_pages_into_the_local_store(processor, local_store, fake_downloads, fake_pages):
+    fake_pages([f"Page {i} text about the grace period. " * 60 for i in range(6)])
+    fake_downloads({BLOB: b"policy v1"})
+    progress = {}
+
+    document_id = asyncio.run(processor.process_document(BLOB, progress))
+
+    assert local_store.has_document(document_id)
+    assert progress["stage"] == "completed"
+    assert progress["pages_extracted"] == 6
+    assert progress["chunks_total"] == progress["chunks_embedded"] == progress["vectors_upserted"] > 0
+    assert processor.registry.get(document_id)["chunk_count"] == progress["chunks_total"]
+
+
+def test_failed_ingestion_leaves_nothing_behind(processor, local_store, fake_downloads):
+    fake_downloads({BLOB: b"policy"})
+
+    async def failing_pages(pdf_path):
+        for i in range(200):
+            yield "text " * 400
+        raise RuntimeError("corrupt page")
+
+    processor.iter_page_texts = failing_pages
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(processor.process_document(BLOB))
+
+    assert local_store._pending == {}
+    assert processor.partial_indexes == {}
@@ -0,0 +1,23 @@
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+from fastapi.testclient import TestClient
+
+import main
+
+def import_main_in_worker():
+    # What a spawned PDF worker does when the server was started with `python main.py`
+    import services.embedding_engine
+
+    return main.embedding_engine is None and services.embedding_engine._engine is None
+
+def test_spawned_worker_importing_main_does_not_load_the_engine():
+    with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as pool:
+        assert pool.submit(import_main_in_worker).result(timeout=120)
+
+def test_malformed_document_id_is_rejected_before_reaching_the_store():
+    client = TestClient(main.app)
+    headers = {"Authorization": f"Bearer {main.API_KEY}"}
+    for document_id in ("../../etc/passwd", "9B1E4C2A7F3D8E6B0A5C1D4F2E7B3A9C", "abc"):
+        response = client.post("/hackrx/run", json={"document_id": document_id, "questions": ["q"]}, headers=headers)
+        assert response.status_code == 422
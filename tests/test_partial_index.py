@@ -0,0 +1,39 @@
+import asyncio
+
+from services.partial_index import PartialIndex
+
+def make_chunks(start, count):
+    return [
+        {"text": f"chunk {i}", "chunk_index": i, "page_number": 1, "start_offset": i * 10}
+        for i in range(start, start + count)
+    ]
+
+def test_query_searches_every_added_batch_best_first(embedding_engine):
+    index = PartialIndex("doc", embedding_engine.dimension)
+    first, second = make_chunks(0, 3), make_chunks(3, 3)
+    index.add(first, embedding_engine.encode([chunk["text"] for chunk in first]))
+    index.add(second, embedding_engine.encode([chunk["text"] for chunk in second]))
+
+    results = index.query(embedding_engine.encode(["chunk 4"])[0], top_k=3)
+
+    assert results[0]["chunk_index"] == 4
+    assert abs(results[0]["score"] - 1.0) < 1e-5
+    assert [result["score"] for result in results] == sorted((result["score"] for result in results), reverse=True)
+    assert index.chunk_count == 6
+
+def test_query_on_an_empty_index_returns_nothing(embedding_engine):
+    index = PartialIndex("doc", embedding_engine.dimension)
+    assert index.query(embedding_engine.encode(["anything"])[0], top_k=5) == []
+
+def test_close_wakes_waiters(embedding_engine):
+    async def main():
+        index = PartialIndex("doc", embedding_engine.dimension)
+        waiter = asyncio.ensure_future(index.wait_for_change(index.version))
+        await asyncio.sleep(0)
+        assert not waiter.done()
+        index.close()
+        await asyncio.wait_for(waiter, 1)
+        return index
+
+    index = asyncio.run(main())
+    assert index.complete and index.closed
@@ -0,0 +1,63 @@
+import asyncio
+
+import pytest
+
+from services.single_flight import SingleFlight
+
+def test_concurrent_calls_with_one_key_share_an_execution():
+    calls = []
+
+    async def work():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return len(calls)
+
+    async def main():
+        flight = SingleFlight()
+        return await asyncio.gather(*(flight.do("key", work) for _ in range(5)))
+
+    assert asyncio.run(main()) == [1] * 5
+    assert calls == [1]
+
+def test_different_keys_run_separately():
+    async def main():
+        flight = SingleFlight()
+        return await asyncio.gather(flight.do("a", lambda: asyncio.sleep(0, "a")), flight.do("b", lambda: asyncio.sleep(0, "b")))
+
+    assert asyncio.run(main()) == ["a", "b"]
+
+def test_finished_keys_are_forgotten_and_errors_shared():
+    async def fail():
+        await asyncio.sleep(0.01)
+        raise ValueError("boom")
+
+    async def main():
+        flight = SingleFlight()
+        results = await asyncio.gather(flight.do("key", fail), flight.do("key", fail), return_exceptions=True)
+        await asyncio.sleep(0)
+        return results, flight.in_flight("key")
+
+    results, in_flight = asyncio.run(main())
+    assert all(isinstance(result, ValueError) for result in results)
+    assert not in_flight
+
+def test_cancelled_caller_does_not_cancel_shared_work():
+    async def main():
+        flight = SingleFlight()
+        done = asyncio.Event()
+
+        async def work():
+            await asyncio.sleep(0.02)
+            done.set()
+            return "result"
+
+        first = asyncio.create_task(flight.do("key", work))
+        await asyncio.sleep(0)
+        second = asyncio.create_task(flight.do("key", work))
+        await asyncio.sleep(0)
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        return await second, done.is_set()
+
+    assert asyncio.run(main()) == ("result", True)
@@ -0,0 +1,40 @@
+import asyncio
+
+QUESTION = "What is the grace period?"
+CHUNKS = [{"text": "A grace period of thirty days is provided.", "score": 0.9, "chunk_index": 0, "page_number": 1}]
+
+def stream(qa_service, deltas):
+    async def retrieve_relevant_chunks(question, document_id, top_k, question_embedding=None):
+        return CHUNKS
+
+    async def stream_gemini(prompt):
+        for delta in deltas:
+            yield delta
+
+    qa_service.retrieve_relevant_chunks = retrieve_relevant_chunks
+    qa_service._stream_gemini = stream_gemini
+    qa_service.expand_context = lambda chunks, document_id, token_budget=None: chunks[0]["text"]
+
+    async def main():
+        return [event async for event in qa_service.stream_answers([QUESTION], "doc", stream_tokens=True)]
+
+    return asyncio.run(main())
+
+def cached_answer(qa_service):
+    return asyncio.run(qa_service._lookup_cached_answer(QUESTION, "doc"))[1]
+
+def test_streamed_answer_is_assembled_from_deltas_and_cached(qa_service):
+    events = stream(qa_service, ["Thirty ", "days."])
+
+    assert events == [
+        {"index": 0, "delta": "Thirty "},
+        {"index": 0, "delta": "days."},
+        {"index": 0, "answer": "Thirty days.", "cached": False}
+    ]
+    assert cached_answer(qa_service) == "Thirty days."
+
+def test_empty_stream_is_an_error_and_is_not_cached(qa_service):
+    events = stream(qa_service, ["  ", "\n"])
+
+    assert events[-1]["answer"].startswith("Error processing question")
+    assert cached_answer(qa_service) is None
@@ -0,0 +1,74 @@
+import asyncio
+
+import numpy as np
+import pytest
+
+def make_chunks(count, text="x" * 100):
+    return [{"text": text, "chunk_index": i, "page_number": 1, "start_offset": i * 100} for i in range(count)]
+
+class UpsertError(Exception):
+    def __init__(self, status):
+        super().__init__(f"status {status}")
+        self.status = status
+
+def test_batches_are_contiguous_and_bounded_by_vector_count(processor):
+    processor.upsert_max_vectors = 4
+    processor.upsert_max_bytes = 10 ** 9
+
+    assert processor.plan_upsert_batches(make_chunks(10)) == [(0, 4), (4, 8), (8, 10)]
+    assert processor.plan_upsert_batches([]) == []
+
+def test_batches_are_bounded_by_estimated_bytes(processor):
+    chunks = make_chunks(10)
+    processor.upsert_max_vectors = 1000
+    processor.upsert_max_bytes = 3 * processor._estimate_vector_bytes(chunks[0])
+
+    assert processor.plan_upsert_batches(chunks) == [(0, 3), (3, 6), (6, 9), (9, 10)]
+
+def test_oversized_chunk_still_gets_its_own_batch(processor):
+    chunks = make_chunks(3)
+    processor.upsert_max_vectors = 1000
+    processor.upsert_max_bytes = 1
+
+    assert processor.plan_upsert_batches(chunks) == [(0, 1), (1, 2), (2, 3)]
+
+def failing_upserts(processor, errors):
+    """Make the store's upsert raise the given errors in turn, then succeed; returns the attempt log"""
+    attempts = []
+    upsert = processor.vector_store.upsert
+
+    def flaky_upsert(document_id, ids, embeddings, metadatas):
+        attempts.append(ids)
+        if len(attempts) <= len(errors):
+            raise errors[len(attempts) - 1]
+        upsert(document_id, ids, embeddings, metadatas)
+
+    processor.vector_store.upsert = flaky_upsert
+    processor.upsert_backoff = 0
+    return attempts
+
+def test_transient_upsert_failures_are_retried(processor, embedding_engine):
+    processor.upsert_retries = 3
+    attempts = failing_upserts(processor, [UpsertError(429), UpsertError(503), ConnectionError("reset")])
+    chunks = make_chunks(2)
+
+    asyncio.run(processor._upsert_with_retry("doc", chunks, embedding_engine.encode([c["text"] for c in chunks])))
+
+    assert len(attempts) == 4
+    assert attempts[-1] == ["doc_chunk_0", "doc_chunk_1"]
+
+def test_client_errors_are_not_retried(processor, embedding_engine):
+    processor.upsert_retries = 3
+    attempts = failing_upserts(processor, [UpsertError(400)])
+
+    with pytest.raises(UpsertError):
+        asyncio.run(processor._upsert_with_retry("doc", make_chunks(1), np.zeros((1, 8), dtype=np.float32)))
+    assert len(attempts) == 1
+
+def test_retries_give_up_after_the_limit(processor):
+    processor.upsert_retries = 2
+    attempts = failing_upserts(processor, [UpsertError(500)] * 5)
+
+    with pytest.raises(UpsertError):
+        asyncio.run(processor._upsert_with_retry("doc", make_chunks(1), np.zeros((1, 8), dtype=np.float32)))
+    assert len(attempts) == 3
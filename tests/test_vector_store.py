@@ -0,0 +1,91 @@
+import numpy as np
+import pytest
+
+from services.vector_store import LocalVectorStore, VectorStore
+
+def unit(vector):
+    vector = np.asarray(vector, dtype=np.float32)
+    return vector / np.linalg.norm(vector)
+
+def upsert_document(store, document_id, vectors):
+    ids = [f"{document_id}_chunk_{i}" for i in range(len(vectors))]
+    metadatas = [{"document_id": document_id, "chunk_index": i, "text": f"chunk {i}"} for i in range(len(vectors))]
+    store.upsert(document_id, ids, np.stack(vectors), metadatas)
+
+def test_query_returns_best_matches_first(local_store):
+    vectors = [unit(np.eye(8)[i] + 0.1) for i in range(5)]
+    upsert_document(local_store, "doc", vectors)
+    local_store.finalize_document("doc")
+
+    matches = local_store.query(vectors[3], "doc", top_k=2)
+
+    assert [match["id"] for match in matches][0] == "doc_chunk_3"
+    assert len(matches) == 2
+    assert matches[0]["score"] >= matches[1]["score"]
+    assert matches[0]["metadata"]["chunk_index"] == 3
+
+def test_documents_are_queried_separately(local_store):
+    upsert_document(local_store, "a", [unit(np.eye(8)[0])])
+    upsert_document(local_store, "b", [unit(np.eye(8)[1])])
+    local_store.finalize_document("a")
+    local_store.finalize_document("b")
+
+    assert [match["id"] for match in local_store.query(unit(np.eye(8)[1]), "a", top_k=5)] == ["a_chunk_0"]
+
+def test_document_is_visible_only_after_finalize(local_store):
+    upsert_document(local_store, "doc", [unit(np.ones(8))])
+
+    assert not local_store.has_document("doc")
+    assert local_store.query(unit(np.ones(8)), "doc", top_k=1) == []
+
+    local_store.finalize_document("doc")
+
+    assert local_store.has_document("doc")
+    assert len(local_store.query(unit(np.ones(8)), "doc", top_k=1)) == 1
+
+def test_finalized_document_survives_a_new_store_instance(local_store):
+    upsert_document(local_store, "doc", [unit(np.ones(8))])
+    local_store.finalize_document("doc")
+
+    reopened = LocalVectorStore(local_store.directory, dimension=8)
+
+    assert reopened.has_document("doc")
+    assert reopened.query(unit(np.ones(8)), "doc", top_k=1)[0]["id"] == "doc_chunk_0"
+
+def test_abort_document_discards_pending_vectors(local_store):
+    upsert_document(local_store, "doc", [unit(np.ones(8))] * 3)
+
+    local_store.abort_document("doc")
+    local_store.finalize_document("doc")
+
+    assert local_store._pending == {}
+    assert not local_store.has_document("doc")
+
+def test_namespace_identifies_the_store_directory(tmp_path):
+    first = LocalVectorStore(str(tmp_path / "one"), dimension=8)
+    second = LocalVectorStore(str(tmp_path / "two"), dimension=8)
+
+    assert first.namespace != second.namespace
+
+def test_loaded_documents_are_bounded_least_recently_queried_first(tmp_path):
+    store = LocalVectorStore(str(tmp_path / "vectors"), dimension=8, max_loaded_documents=2)
+    for i, document_id in enumerate(("a", "b", "c")):
+        upsert_document(store, document_id, [unit(np.eye(8)[i])])
+        store.finalize_document(document_id)
+
+    store.query(unit(np.eye(8)[0]), "a", top_k=1)
+    store.query(unit(np.eye(8)[1]), "b", top_k=1)
+    store.query(unit(np.eye(8)[0]), "a", top_k=1)
+    store.query(unit(np.eye(8)[2]), "c", top_k=1)
+
+    assert list(store._loaded) == ["a", "c"]
+    # An evicted document is reloaded from disk on its next query
+    assert store.query(unit(np.eye(8)[1]), "b", top_k=1)[0]["id"] == "b_chunk_0"
+
+def test_vector_store_interface_cannot_be_instantiated_partially():
+    class UpsertOnly(VectorStore):
+        def upsert(self, document_id, ids, embeddings, metadatas):
+            pass
+
+    with pytest.raises(TypeError):
+        UpsertOnly()